@@ -1,42 +1,66 @@
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import os
 import shutil
 import uuid
-import json
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import re
 import asyncio
 import time
-import cv2
-import numpy as np
-from PIL import Image
-import io
+import logging
 import base64
+from pathlib import Path
+from contextlib import asynccontextmanager
 
 # Import local modules - ensure compatibility with Docker and local environments
 if "/app" in os.environ.get("PYTHONPATH", ""):
     # Docker environment
-    from models.vision_llm import VisionLLM
+    from models.vision_llm import get_vision_llm
     from utils.metadata_extractor import MetadataExtractor
     from utils.geo_service import GeoService
     from utils.video_processor import VideoProcessor
     from utils.mapbox_service import MapboxService
+    from utils.enhanced_cache import cache_manager
 else:
     # Local environment
-    from src.models.vision_llm import VisionLLM
+    from src.models.vision_llm import get_vision_llm
     from src.utils.metadata_extractor import MetadataExtractor
     from src.utils.geo_service import GeoService
     from src.utils.video_processor import VideoProcessor
     from src.utils.mapbox_service import MapboxService
+    from src.utils.enhanced_cache import cache_manager
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the database tables once per process on startup and flush pending writes on shutdown."""
+    try:
+        if "/app" in os.environ.get("PYTHONPATH", ""):
+            from models.database import db_manager
+        else:
+            from src.models.database import db_manager
+        await run_in_threadpool(db_manager.create_tables)
+    except Exception as e:
+        logger.error(f"Error initializing database: {str(e)}")
+        
+    yield
+    
+    results_writer.shutdown(wait=True)
 
 # Create FastAPI app
 app = FastAPI(
     title="Drone OSINT GeoSpy API",
-    description="API for processing drone imagery and video for geolocation analysis"
+    description="API for processing drone imagery and video for geolocation analysis",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -48,6 +72,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger JSON payloads (analysis results, base64 static maps, map HTML)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Define data models
 class ChatRequest(BaseModel):
     image_id: str
@@ -58,6 +85,7 @@ class AnalysisResponse(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
     llm_analysis: Optional[Dict[str, Any]] = None
     geo_data: Optional[Dict[str, Any]] = None
+    status: Optional[str] = None
     error: Optional[str] = None
 
 class MapRequest(BaseModel):
@@ -84,23 +112,37 @@ mapbox_service = MapboxService()
 
 # Initialize VisionLLM
 try:
-    vision_llm = VisionLLM()
+    vision_llm = get_vision_llm()
 except Exception as e:
     print(f"WARNING: Failed to initialize VisionLLM: {str(e)}")
     vision_llm = None
 
 video_processor = VideoProcessor(output_dir="./data/frames")
 
+# Cache for static map payloads (base64 data URLs), keyed by quantized coordinates
+static_map_cache = cache_manager.get_or_create_cache("static_maps", max_size=64, ttl_seconds=1800)
+
 # Ensure data directories exist
 os.makedirs("./data/uploads", exist_ok=True)
 os.makedirs("./data/frames", exist_ok=True)
-os.makedirs("./data/results", exist_ok=True)
+RESULTS_DIR = Path("./data/results")
+RESULTS_DIR.mkdir(parents=True, exist_ok=True)
 
 # Store active analysis sessions
 active_sessions = {}
 
+# Writer pool so result files are persisted off the request path
+results_writer = ThreadPoolExecutor(max_workers=2, thread_name_prefix="results-writer")
+
+def _write_results_file(path: Path, data: bytes):
+    """Write serialized analysis results to disk."""
+    try:
+        path.write_bytes(data)
+    except Exception as e:
+        print(f"Error saving analysis results to {path}: {str(e)}")
+
 # Health check endpoint for Docker healthcheck
-@app.get("/api/session/health", response_model=Dict[str, str])
+@app.get("/api/session/health", response_model=None)
 async def health_check():
     """
     Health check endpoint for monitoring.
@@ -110,7 +152,7 @@ async def health_check():
         "timestamp": datetime.now().isoformat()
     }
 
-@app.post("/api/upload/image", response_model=Dict[str, Any])
+@app.post("/api/upload/image", response_model=None)
 async def upload_image(file: UploadFile = File(...), background_tasks: BackgroundTasks = None):
     """
     Upload an image for analysis.
@@ -157,11 +199,49 @@ async def upload_image(file: UploadFile = File(...), background_tasks: Backgroun
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error uploading image: {str(e)}")
 
-@app.post("/api/analyze/image/{image_id}", response_model=AnalysisResponse)
-async def analyze_image(image_id: str):
+@app.post("/api/analyze/image/{image_id}", response_model=None, responses={200: {"model": AnalysisResponse}})
+async def analyze_image(image_id: str, background_tasks: BackgroundTasks, background: bool = False):
     """
     Analyze an uploaded image to extract metadata and perform analysis.
+    
+    With ``background=true`` the analysis is scheduled and the call returns
+    immediately with status "pending"; poll /api/analyze/status/{image_id}
+    for the results.
+    """
+    if background:
+        if image_id not in active_sessions:
+            raise HTTPException(status_code=404, detail=f"Image with ID {image_id} not found")
+        
+        active_sessions[image_id]["status"] = "pending"
+        background_tasks.add_task(run_image_analysis, image_id)
+        return AnalysisResponse(image_id=image_id, status="pending")
+    
+    # Run the blocking LLM call in a worker thread so the event loop stays free
+    return await run_in_threadpool(run_image_analysis, image_id)
+
+@app.get("/api/analyze/status/{image_id}", response_model=None, responses={200: {"model": AnalysisResponse}})
+async def analyze_image_status(image_id: str):
     """
+    Get the status of an image analysis, including the results once completed.
+    """
+    if image_id not in active_sessions:
+        raise HTTPException(status_code=404, detail=f"Image with ID {image_id} not found")
+    
+    session = active_sessions[image_id]
+    status = session.get("status")
+    if status != "completed":
+        return AnalysisResponse(image_id=image_id, status=status, error=session.get("error"))
+    
+    return AnalysisResponse(
+        image_id=image_id,
+        metadata=session.get("metadata"),
+        llm_analysis=session.get("llm_analysis"),
+        geo_data=session.get("geo_data"),
+        status=status
+    )
+
+def run_image_analysis(image_id: str) -> AnalysisResponse:
+    """Extract metadata and run the Vision LLM analysis for an uploaded image."""
     try:
         # Check if image exists in active sessions
         if image_id not in active_sessions:
@@ -184,8 +264,8 @@ async def analyze_image(image_id: str):
         with open(file_path, "rb") as image_file:
             image_data = image_file.read()
         
-        # Analyze image with Vision LLM
-        llm_analysis = vision_llm.analyze_image(file_path)
+        # Analyze image with Vision LLM (reuses the bytes read above)
+        llm_analysis = vision_llm.analyze_image(image_data)
         session["llm_analysis"] = llm_analysis
         
         # Process geolocation data
@@ -237,21 +317,25 @@ async def analyze_image(image_id: str):
             image_id=image_id,
             metadata=metadata,
             llm_analysis=llm_analysis,
-            geo_data=geo_data
+            geo_data=geo_data,
+            status="completed"
         )
         
         # Guardar los resultados en un archivo JSON para facilitar la depuración
-        results_file_path = f"./data/results/{image_id}.json"
-        with open(results_file_path, "w") as f:
-            result_dict = result.dict(exclude_none=True)
-            json.dump(result_dict, f, indent=2)
+        results_file_path = RESULTS_DIR / f"{image_id}.json"
+        result_bytes = orjson.dumps(
+            result.dict(exclude_none=True),
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        )
+        results_writer.submit(_write_results_file, results_file_path, result_bytes)
             
-        print(f"Saved analysis results to {results_file_path}")
-        print(f"LLM analysis has fields: {', '.join(llm_analysis.keys())}")
-        if geo_data:
-            print(f"Geo data has fields: {', '.join(geo_data.keys())}")
-            if "merged_data" in geo_data:
-                print(f"Merged data has fields: {', '.join(geo_data['merged_data'].keys())}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Saving analysis results to %s", results_file_path)
+            logger.debug("LLM analysis has fields: %s", ", ".join(llm_analysis.keys()))
+            if geo_data:
+                logger.debug("Geo data has fields: %s", ", ".join(geo_data.keys()))
+                if "merged_data" in geo_data:
+                    logger.debug("Merged data has fields: %s", ", ".join(geo_data["merged_data"].keys()))
                 
         return result
         
@@ -261,10 +345,11 @@ async def analyze_image(image_id: str):
             active_sessions[image_id]["error"] = str(e)
         return AnalysisResponse(
             image_id=image_id,
+            status="error",
             error=f"Error analyzing image: {str(e)}"
         )
 
-@app.post("/api/chat/image/{image_id}", response_model=Dict[str, Any])
+@app.post("/api/chat/image/{image_id}", response_model=None)
 async def chat_with_image(image_id: str, request: ChatRequest):
     """
     Chat with the Vision LLM about an image.
@@ -289,20 +374,7 @@ async def chat_with_image(image_id: str, request: ChatRequest):
         )
         
         # Store conversation in session
-        if "conversation" not in session:
-            session["conversation"] = []
-            
-        session["conversation"].append({
-            "role": "user",
-            "message": request.message,
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        session["conversation"].append({
-            "role": "assistant",
-            "message": response,
-            "timestamp": datetime.now().isoformat()
-        })
+        record_conversation(session, request.message, response)
         
         return {
             "image_id": image_id,
@@ -313,7 +385,34 @@ async def chat_with_image(image_id: str, request: ChatRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in chat: {str(e)}")
 
-@app.post("/api/upload/video", response_model=Dict[str, Any])
+@app.post("/api/chat/image/{image_id}/stream")
+async def stream_chat_with_image(image_id: str, request: ChatRequest):
+    """
+    Chat with the Vision LLM about an image, streaming the answer as plain text while it is generated.
+    """
+    # Check if image exists in active sessions
+    if image_id not in active_sessions:
+        raise HTTPException(status_code=404, detail=f"Image with ID {image_id} not found")
+        
+    # Fail before the streaming response is started, while an error status can still be sent
+    if vision_llm is None:
+        raise HTTPException(status_code=503, detail="Vision LLM service is not available")
+    
+    session = active_sessions[image_id]
+    file_path = session["file_path"]
+    
+    def generate():
+        chunks = []
+        for text in vision_llm.stream_chat_about_image(file_path, request.message):
+            chunks.append(text)
+            yield text
+            
+        # Store the full answer once the stream is complete
+        record_conversation(session, request.message, {"llm_analysis": {"response": "".join(chunks)}})
+    
+    return StreamingResponse(generate(), media_type="text/plain; charset=utf-8")
+
+@app.post("/api/upload/video", response_model=None)
 async def upload_video(file: UploadFile = File(...), background_tasks: BackgroundTasks = None):
     """
     Upload a video for analysis.
@@ -355,7 +454,7 @@ async def upload_video(file: UploadFile = File(...), background_tasks: Backgroun
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error uploading video: {str(e)}")
 
-@app.post("/api/stream/connect", response_model=Dict[str, Any])
+@app.post("/api/stream/connect", response_model=None)
 async def connect_stream(stream_url: str = Form(...)):
     """
     Connect to a video stream (like RTSP from a drone).
@@ -388,7 +487,7 @@ async def connect_stream(stream_url: str = Form(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error connecting to stream: {str(e)}")
 
-@app.post("/api/stream/disconnect/{stream_id}", response_model=Dict[str, Any])
+@app.post("/api/stream/disconnect/{stream_id}", response_model=None)
 async def disconnect_stream(stream_id: str):
     """
     Disconnect from a video stream.
@@ -414,7 +513,7 @@ async def disconnect_stream(stream_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error disconnecting from stream: {str(e)}")
 
-@app.get("/api/stream/latest-frame/{stream_id}", response_model=Dict[str, Any])
+@app.get("/api/stream/latest-frame/{stream_id}", response_model=None)
 async def get_latest_frame(stream_id: str, analyze: bool = False):
     """
     Get the latest frame from a video stream and optionally analyze it.
@@ -424,8 +523,8 @@ async def get_latest_frame(stream_id: str, analyze: bool = False):
         if stream_id not in active_sessions:
             raise HTTPException(status_code=404, detail=f"Stream with ID {stream_id} not found")
             
-        # Get latest frame
-        result = video_processor.get_latest_frame()
+        # Get latest frame (disk listing + decode, keep it off the event loop)
+        result = await run_in_threadpool(video_processor.get_latest_frame)
         if not result:
             return {
                 "stream_id": stream_id,
@@ -452,34 +551,15 @@ async def get_latest_frame(stream_id: str, analyze: bool = False):
             "frame_id": frame_id,
             "stream_id": stream_id,
             "status": "captured",
-            "file_path": frame_path
+            "file_path": frame_path,
+            # nginx serves the data directory at /data/
+            "frame_url": f"/data/frames/{os.path.basename(frame_path)}"
         }
         
         # Analyze the frame if requested
         if analyze:
-            # Extract metadata
-            metadata = metadata_extractor.extract_metadata(frame_path)
-            
-            # Extract GPS coordinates from metadata if available
-            gps_coords = metadata.get("gps_coordinates")
-            
-            # Analyze image with Vision LLM
-            llm_analysis = vision_llm.analyze_image(frame_path)
-            
-            # Process geolocation data
-            geo_data = None
-            if "location_assessment" in llm_analysis:
-                # Extract coordinates from LLM analysis
-                coords = llm_analysis["location_assessment"].get("coordinates")
-                address = llm_analysis["location_assessment"].get("address")
-                
-                llm_geo_data = {
-                    "coordinates": coords,
-                    "address": address
-                }
-                
-                # Merge LLM and metadata location data
-                geo_data = geo_service.merge_location_data(llm_geo_data, gps_coords)
+            # Run the blocking metadata/LLM/geo work in the threadpool
+            metadata, llm_analysis, geo_data = await run_in_threadpool(analyze_frame, frame_path)
             
             # Update frame information
             active_sessions[frame_id]["metadata"] = metadata
@@ -498,7 +578,7 @@ async def get_latest_frame(stream_id: str, analyze: bool = False):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting latest frame: {str(e)}")
 
-@app.get("/api/session/{session_id}", response_model=Dict[str, Any])
+@app.get("/api/session/{session_id}", response_model=None)
 async def get_session(session_id: str):
     """
     Get information about an active session.
@@ -517,7 +597,7 @@ async def get_session(session_id: str):
 async def generate_map(request: MapRequest):
     """Generate a map for the given coordinates."""
     try:
-        # Generate map using GeoService
+        # Generate map using GeoService (cached there by quantized coordinates)
         map_html = geo_service.generate_map(
             latitude=request.latitude,
             longitude=request.longitude,
@@ -526,13 +606,13 @@ async def generate_map(request: MapRequest):
         
         if not map_html:
             raise HTTPException(status_code=500, detail="Failed to generate map")
-            
+        
         return {"map_html": map_html}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating map: {str(e)}")
 
-@app.post("/api/location/compare", response_model=Dict[str, Any])
+@app.post("/api/location/compare", response_model=None)
 async def compare_image_with_maps(request: ImageComparisonRequest):
     """
     Compare an uploaded image with maps using Mapbox.
@@ -562,11 +642,15 @@ async def compare_image_with_maps(request: ImageComparisonRequest):
             if lat is None or lon is None:
                 raise HTTPException(status_code=400, detail="No coordinates provided and none found in analysis")
         
+        # Render the interactive map in the background while the comparison images are fetched
+        mapbox_service.prewarm_interactive_map(lat, lon)
+        
+        # Mapbox calls block (HTTP and rate limiting), so they run in the threadpool
         # Generate comparison HTML
-        comparison_html = mapbox_service.generate_comparison_html(file_path, lat, lon)
+        comparison_html = await run_in_threadpool(mapbox_service.generate_comparison_html, file_path, lat, lon)
         
         # Generate interactive map
-        interactive_map = mapbox_service.generate_interactive_map(lat, lon)
+        interactive_map = await run_in_threadpool(mapbox_service.generate_interactive_map, lat, lon)
         
         return {
             "image_id": request.image_id,
@@ -581,13 +665,14 @@ async def compare_image_with_maps(request: ImageComparisonRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error comparing image with maps: {str(e)}")
 
-@app.post("/api/location/satellite", response_model=Dict[str, Any])
+@app.post("/api/location/satellite", response_model=None)
 async def get_satellite_image(request: MapRequest):
     """
     Get a satellite image for the given coordinates using Mapbox.
     """
     try:
-        satellite_image = mapbox_service.get_satellite_image(
+        satellite_image = await run_in_threadpool(
+            mapbox_service.get_satellite_image,
             latitude=request.latitude,
             longitude=request.longitude
         )
@@ -609,12 +694,13 @@ async def get_satellite_image(request: MapRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting satellite image: {str(e)}")
 
-@app.post("/api/generate/interactive_map", response_model=Dict[str, Any])
+@app.post("/api/generate/interactive_map", response_model=None)
 async def generate_interactive_map(request: MapRequest):
     """Generate an interactive map with Mapbox tiles for the given coordinates."""
     try:
-        # Generate map using MapboxService
-        map_html = mapbox_service.generate_interactive_map(
+        # Generate map using MapboxService (cached per coordinates inside the service)
+        map_html = await run_in_threadpool(
+            mapbox_service.generate_interactive_map,
             latitude=request.latitude,
             longitude=request.longitude,
             zoom=15
@@ -622,19 +708,20 @@ async def generate_interactive_map(request: MapRequest):
         
         if not map_html:
             raise HTTPException(status_code=500, detail="Failed to generate interactive map")
-            
+        
         return {"map_html": map_html}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating interactive map: {str(e)}")
 
-@app.post("/api/geocode/forward", response_model=Dict[str, Any])
+@app.post("/api/geocode/forward", response_model=None)
 async def geocode_forward(request: GeocodeRequest):
     """
     Perform forward geocoding (address to coordinates) using Mapbox Geocoding API.
     """
     try:
-        results = mapbox_service.geocode_forward(
+        results = await run_in_threadpool(
+            mapbox_service.geocode_forward,
             query=request.query,
             limit=request.limit if request.limit is not None else 5
         )
@@ -651,13 +738,14 @@ async def geocode_forward(request: GeocodeRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in forward geocoding: {str(e)}")
 
-@app.post("/api/geocode/reverse", response_model=Dict[str, Any])
+@app.post("/api/geocode/reverse", response_model=None)
 async def geocode_reverse(request: ReverseGeocodeRequest):
     """
     Perform reverse geocoding (coordinates to address) using Mapbox Geocoding API.
     """
     try:
-        result = mapbox_service.geocode_reverse(
+        result = await run_in_threadpool(
+            mapbox_service.geocode_reverse,
             longitude=request.longitude,
             latitude=request.latitude
         )
@@ -676,14 +764,28 @@ async def geocode_reverse(request: ReverseGeocodeRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in reverse geocoding: {str(e)}")
 
-@app.post("/api/static-map", response_model=Dict[str, Any])
+@app.post("/api/static-map", response_model=None)
 async def get_static_map(request: MapRequest, style: str = "streets-v11", width: int = 600, height: int = 400, zoom: int = 15):
     """
     Generate a static map image for the given coordinates using Mapbox Static Images API.
     """
     try:
+        # Serve repeated views of the same location from the cache
+        cache_key = f"{request.latitude:.5f},{request.longitude:.5f},{style},{zoom},{width}x{height}"
+        image_data = static_map_cache.get(cache_key)
+        if image_data:
+            return {
+                "coordinates": {
+                    "latitude": request.latitude,
+                    "longitude": request.longitude
+                },
+                "style": style,
+                "image_data": image_data
+            }
+        
         # Generate map using MapboxService
-        map_image = mapbox_service.get_static_map(
+        map_image = await run_in_threadpool(
+            mapbox_service.get_static_map,
             latitude=request.latitude,
             longitude=request.longitude,
             zoom=zoom,
@@ -698,6 +800,8 @@ async def get_static_map(request: MapRequest, style: str = "streets-v11", width:
         
         # Encode the image to base64 for response
         image_b64 = base64.b64encode(map_image).decode('utf-8')
+        image_data = f"data:image/png;base64,{image_b64}"
+        static_map_cache.set(cache_key, image_data)
         
         return {
             "coordinates": {
@@ -705,7 +809,7 @@ async def get_static_map(request: MapRequest, style: str = "streets-v11", width:
                 "longitude": request.longitude
             },
             "style": style,
-            "image_data": f"data:image/png;base64,{image_b64}"
+            "image_data": image_data
         }
         
     except Exception as e:
@@ -878,8 +982,9 @@ def analyze_image_task(image_id: str, file_path: str):
         results["geo_data"] = geo_data
         
         # Guardar con indentación para facilitar la lectura
-        with open(f"./data/results/{image_id}.json", "w") as f:
-            json.dump(results, f, indent=2)
+        (RESULTS_DIR / f"{image_id}.json").write_bytes(
+            orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        )
             
     except Exception as e:
         print(f"Error in background analysis: {str(e)}")
@@ -887,6 +992,51 @@ def analyze_image_task(image_id: str, file_path: str):
             active_sessions[image_id]["status"] = "error"
             active_sessions[image_id]["error"] = str(e)
 
+def record_conversation(session: Dict[str, Any], message: str, response: Any):
+    """Append a user/assistant exchange to the session's conversation history."""
+    if "conversation" not in session:
+        session["conversation"] = []
+        
+    session["conversation"].append({
+        "role": "user",
+        "message": message,
+        "timestamp": datetime.now().isoformat()
+    })
+    
+    session["conversation"].append({
+        "role": "assistant",
+        "message": response,
+        "timestamp": datetime.now().isoformat()
+    })
+
+def analyze_frame(frame_path: str):
+    """Extract metadata, run the Vision LLM and merge geolocation data for a stream frame."""
+    # Extract metadata
+    metadata = metadata_extractor.extract_metadata(frame_path)
+    
+    # Extract GPS coordinates from metadata if available
+    gps_coords = metadata.get("gps_coordinates")
+    
+    # Analyze image with Vision LLM
+    llm_analysis = vision_llm.analyze_image(frame_path)
+    
+    # Process geolocation data
+    geo_data = None
+    if "location_assessment" in llm_analysis:
+        # Extract coordinates from LLM analysis
+        coords = llm_analysis["location_assessment"].get("coordinates")
+        address = llm_analysis["location_assessment"].get("address")
+        
+        llm_geo_data = {
+            "coordinates": coords,
+            "address": address
+        }
+        
+        # Merge LLM and metadata location data
+        geo_data = geo_service.merge_location_data(llm_geo_data, gps_coords)
+    
+    return metadata, llm_analysis, geo_data
+
 def extract_video_frames_task(video_id: str, file_path: str):
     """Background task to extract frames from a video."""
     try:
@@ -0,0 +1,68 @@
+import orjson
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+def _as_dict(value) -> Dict[str, Any]:
+    """Return value if it is a dict, otherwise an empty dict"""
+    return value if isinstance(value, dict) else {}
+
+
+@dataclass
+class AnalysisSummary:
+    """Flat view of the backend analysis response used by the frontend models"""
+    description: str = 'No description available'
+    confidence: str = 'low'
+    country: str = 'Unknown'
+    city: str = 'Unknown'
+    neighborhood: str = 'Unknown'
+    street: str = 'Unknown'
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    architectural_features: List[str] = field(default_factory=list)
+    landscape_features: List[str] = field(default_factory=list)
+    camera_make: str = 'Unknown'
+    camera_model: str = 'Unknown'
+
+    @classmethod
+    def from_response(cls, analysis_data: Dict[str, Any]) -> 'AnalysisSummary':
+        """Parse the /api/analyze/image response in a single pass"""
+        summary = cls()
+
+        # LLM Analysis
+        llm_analysis = analysis_data.get('llm_analysis')
+        if isinstance(llm_analysis, str):
+            summary.description = llm_analysis
+            summary.confidence = 'medium'
+        elif isinstance(llm_analysis, dict):
+            summary.description = llm_analysis.get('description', summary.description)
+            summary.confidence = llm_analysis.get('confidence', summary.confidence)
+
+        # Geo Data
+        geo_data = analysis_data.get('geo_data')
+        if isinstance(geo_data, str):
+            try:
+                geo_data = orjson.loads(geo_data)
+            except orjson.JSONDecodeError:
+                geo_data = {'text_analysis': geo_data}
+        geo_data = _as_dict(geo_data)
+
+        summary.country = geo_data.get('country', summary.country)
+        summary.city = geo_data.get('city', summary.city)
+        summary.neighborhood = geo_data.get('neighborhood', summary.neighborhood)
+        summary.street = geo_data.get('street', summary.street)
+        summary.architectural_features = geo_data.get('architectural_features', [])
+        summary.landscape_features = geo_data.get('landscape_features', [])
+
+        coordinates = _as_dict(geo_data.get('coordinates'))
+        lat = coordinates.get('latitude')
+        lon = coordinates.get('longitude')
+        summary.latitude = float(lat) if lat else None
+        summary.longitude = float(lon) if lon else None
+
+        # Metadata
+        camera_info = _as_dict(_as_dict(analysis_data.get('metadata')).get('camera_info'))
+        summary.camera_make = camera_info.get('make', summary.camera_make)
+        summary.camera_model = camera_info.get('model', summary.camera_model)
+
+        return summary
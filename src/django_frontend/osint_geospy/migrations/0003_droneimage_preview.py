@@ -0,0 +1,19 @@
+# Generated by Django 4.2.10 on 2026-10-15 10:12
+
+from django.db import migrations, models
+import osint_geospy.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osint_geospy', '0002_droneimage_backend_image_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='droneimage',
+            name='preview',
+            field=models.ImageField(blank=True, upload_to=osint_geospy.models.get_preview_path),
+        ),
+    ]
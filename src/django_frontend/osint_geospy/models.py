@@ -9,12 +9,20 @@ def get_upload_path(instance, filename):
     filename = f"{uuid.uuid4()}.{ext}"
     return os.path.join('uploads', filename)
 
+# Bounding box for the downscaled images shown in the UI
+PREVIEW_SIZE = (1024, 1024)
+
+def get_preview_path(instance, filename):
+    """Function to generate the file path for image previews"""
+    return os.path.join('previews', filename)
+
 class DroneImage(models.Model):
     """Model for storing drone images"""
     image_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=255, blank=True)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to=get_upload_path)
+    preview = models.ImageField(upload_to=get_preview_path, blank=True)
     uploaded_at = models.DateTimeField(default=timezone.now)
     
     # Backend reference
@@ -34,6 +42,21 @@ class DroneImage(models.Model):
     def __str__(self):
         return f"Image {self.image_id}"
     
+    def build_preview(self):
+        """Create a downscaled JPEG preview, keeping the original for analysis"""
+        import io
+        from PIL import Image
+        from django.core.files.base import ContentFile
+        
+        with Image.open(self.image.path) as img:
+            # Let the JPEG decoder skip detail we would throw away anyway
+            img.draft('RGB', PREVIEW_SIZE)
+            img.thumbnail(PREVIEW_SIZE)
+            buffer = io.BytesIO()
+            img.convert('RGB').save(buffer, format='JPEG', quality=85)
+        
+        self.preview.save(f"{self.image_id}.jpg", ContentFile(buffer.getvalue()), save=False)
+    
     class Meta:
         ordering = ['-uploaded_at']
 
@@ -1,29 +1,34 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.conf import settings
 from django.contrib import messages
+from django.core.cache import cache
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 import requests
-import json
+import orjson
 import os
 import uuid
-import base64
+import hashlib
 from datetime import datetime
+from PIL import UnidentifiedImageError
 from .models import DroneImage, AnalysisResult, ChatMessage
-import io
-from PIL import Image
-import hashlib
+from .analysis import AnalysisSummary
 
 # API URL from settings
 API_URL = settings.API_URL
 MAPBOX_TOKEN = settings.MAPBOX_API_KEY
 
+# Shared HTTP session so calls to the backend reuse keep-alive connections
+api_session = requests.Session()
+
+# How long forward-geocoding results are reused before asking the backend again
+GEOCODE_CACHE_TIMEOUT = 300
+
 def index(request):
     """Home page view"""
-    # Generate session ID if not present
-    if 'session_id' not in request.session:
-        request.session['session_id'] = hashlib.md5(str(datetime.now().timestamp()).encode()).hexdigest()[:8]
+    # Generate session ID once per session
+    request.session.setdefault('session_id', uuid.uuid4().hex[:8])
     
     context = {
         'title': 'DRONE OSINT GEOSPY',
@@ -34,12 +39,19 @@ def index(request):
 
 def image_analysis(request):
     """Image analysis view"""
-    # Get recent images for display
-    recent_images = DroneImage.objects.all().order_by('-uploaded_at')[:5]
+    # Only load the image (and its latest result) that the report shows
+    current_image = None
+    current_result = None
+    current_image_id = request.session.get('current_image_id')
+    if current_image_id:
+        current_image = DroneImage.objects.filter(image_id=current_image_id).first()
+        if current_image:
+            current_result = current_image.results.first()
     
     context = {
         'title': 'Image Analysis',
-        'recent_images': recent_images,
+        'current_image': current_image,
+        'current_result': current_result,
         'mapbox_token': MAPBOX_TOKEN,
     }
     return render(request, 'osint_geospy/image_analysis.html', context)
@@ -59,14 +71,23 @@ def analyze_image(request):
             )
             drone_image.save()
             
+            # Downscaled preview for display; the original is still sent to the backend
+            try:
+                drone_image.build_preview()
+                drone_image.save(update_fields=['preview'])
+            except (OSError, UnidentifiedImageError) as e:
+                messages.warning(request, f"Could not create image preview: {str(e)}")
+            
             # Call backend API to upload image
             try:
-                image_data = open(drone_image.image.path, 'rb').read()
-                files = {"file": (uploaded_file.name, image_data, "image/jpeg")}
-                response = requests.post(f"{API_URL}/api/upload/image", files=files)
+                # Hand requests the open file instead of a bytes copy of the image
+                content_type = uploaded_file.content_type or "image/jpeg"
+                with open(drone_image.image.path, 'rb') as image_file:
+                    files = {"file": (uploaded_file.name, image_file, content_type)}
+                    response = api_session.post(f"{API_URL}/api/upload/image", files=files)
                 
                 if response.status_code == 200:
-                    upload_data = response.json()
+                    upload_data = orjson.loads(response.content)
                     backend_image_id = upload_data.get("image_id")
                     
                     # Save the backend image ID to our model
@@ -74,52 +95,20 @@ def analyze_image(request):
                     drone_image.save()
                     
                     # Analyze the image using backend
-                    analysis_response = requests.post(f"{API_URL}/api/analyze/image/{backend_image_id}")
+                    analysis_response = api_session.post(f"{API_URL}/api/analyze/image/{backend_image_id}")
                     
                     if analysis_response.status_code == 200:
-                        analysis_data = analysis_response.json()
+                        analysis_data = orjson.loads(analysis_response.content)
                         
                         # Extract data with error handling
                         try:
-                            # LLM Analysis
-                            llm_analysis = analysis_data.get('llm_analysis', {})
-                            if isinstance(llm_analysis, str):
-                                description = llm_analysis
-                                confidence = 'medium'
-                            else:
-                                description = llm_analysis.get('description', 'No description available')
-                                confidence = llm_analysis.get('confidence', 'low')
-                            
-                            # Geo Data
-                            geo_data = analysis_data.get('geo_data', {})
-                            if isinstance(geo_data, str):
-                                try:
-                                    geo_data = json.loads(geo_data)
-                                except json.JSONDecodeError:
-                                    geo_data = {'text_analysis': geo_data}
-                            
-                            # Extract location data
-                            country = geo_data.get('country', 'Unknown')
-                            city = geo_data.get('city', 'Unknown')
-                            neighborhood = geo_data.get('neighborhood', 'Unknown')
-                            street = geo_data.get('street', 'Unknown')
-                            coordinates = geo_data.get('coordinates', {})
-                            lat = coordinates.get('latitude', 0)
-                            lon = coordinates.get('longitude', 0)
-                            features = geo_data.get('architectural_features', [])
-                            landscape_features = geo_data.get('landscape_features', [])
-                            
-                            # Metadata
-                            metadata = analysis_data.get('metadata', {})
-                            camera_info = metadata.get('camera_info', {})
-                            make = camera_info.get('make', 'Unknown')
-                            model = camera_info.get('model', 'Unknown')
+                            summary = AnalysisSummary.from_response(analysis_data)
                             
                             # Update DroneImage model with metadata
-                            drone_image.latitude = float(lat) if lat else None
-                            drone_image.longitude = float(lon) if lon else None
-                            drone_image.camera_make = make
-                            drone_image.camera_model = model
+                            drone_image.latitude = summary.latitude
+                            drone_image.longitude = summary.longitude
+                            drone_image.camera_make = summary.camera_make
+                            drone_image.camera_model = summary.camera_model
                             drone_image.analyzed = True
                             drone_image.analysis_result = analysis_data
                             drone_image.save()
@@ -127,14 +116,14 @@ def analyze_image(request):
                             # Create AnalysisResult object
                             analysis_result = AnalysisResult(
                                 drone_image=drone_image,
-                                country=country,
-                                city=city,
-                                street=street,
-                                neighborhood=neighborhood,
-                                description=description,
-                                confidence=confidence,
-                                architectural_features=features,
-                                landscape_features=landscape_features
+                                country=summary.country,
+                                city=summary.city,
+                                street=summary.street,
+                                neighborhood=summary.neighborhood,
+                                description=summary.description,
+                                confidence=summary.confidence,
+                                architectural_features=summary.architectural_features,
+                                landscape_features=summary.landscape_features
                             )
                             analysis_result.save()
                             
@@ -197,14 +186,22 @@ def search_location(request):
         
         if location_query:
             try:
+                # Reuse recent results for the same query instead of calling the backend again
+                cache_key = "geocode:" + hashlib.md5(location_query.strip().lower().encode()).hexdigest()
+                results = cache.get(cache_key)
+                if results is not None:
+                    request.session['location_results'] = results
+                    return redirect('osint_geospy:image_analysis')
+                
                 # Call geocoding API
-                geocode_response = requests.post(
+                geocode_response = api_session.post(
                     f"{API_URL}/api/geocode/forward",
                     json={"query": location_query, "limit": 5}
                 )
                 
                 if geocode_response.status_code == 200:
-                    results = geocode_response.json().get("results", [])
+                    results = orjson.loads(geocode_response.content).get("results", [])
+                    cache.set(cache_key, results, GEOCODE_CACHE_TIMEOUT)
                     
                     # Store results in session
                     request.session['location_results'] = results
@@ -223,7 +220,7 @@ def chat_with_image(request):
     if request.method == 'POST':
         try:
             # Get request data
-            data = json.loads(request.body)
+            data = orjson.loads(request.body)
             user_message = data.get('message', '')
             image_id = data.get('image_id', '')
             
@@ -254,33 +251,39 @@ def chat_with_image(request):
                 related_image=image
             )
             
-            # Call the backend API to get AI response
-            response = requests.post(
-                f"{API_URL}/api/chat/image/{backend_image_id}",
-                json={"message": user_message, "image_id": backend_image_id}
+            # Call the backend API and relay the AI response while it is generated
+            response = api_session.post(
+                f"{API_URL}/api/chat/image/{backend_image_id}/stream",
+                json={"message": user_message, "image_id": backend_image_id},
+                # Uncompressed so each chunk is relayed as soon as the backend sends it
+                headers={"Accept-Encoding": "identity"},
+                stream=True
             )
             
-            if response.status_code == 200:
-                # Extract the response text
-                response_data = response.json()
-                ai_response = response_data.get('response', {}).get('llm_analysis', {}).get('response', 'No response received')
-                
-                # Create new AI message in database
-                ai_chat_message = ChatMessage.objects.create(
-                    role='assistant',
-                    content=ai_response,
-                    session_id=session_id,
-                    related_image=image
-                )
-                
-                return JsonResponse({
-                    'success': True,
-                    'response': ai_response
-                })
-            else:
+            if response.status_code != 200:
                 return JsonResponse({
                     'error': f"Backend API error: {response.text}"
                 }, status=response.status_code)
+            
+            def relay():
+                chunks = []
+                try:
+                    for text in response.iter_content(chunk_size=None, decode_unicode=True):
+                        if text:
+                            chunks.append(text)
+                            yield text
+                finally:
+                    response.close()
+                    
+                    # Create new AI message in database
+                    ChatMessage.objects.create(
+                        role='assistant',
+                        content=''.join(chunks) or 'No response received',
+                        session_id=session_id,
+                        related_image=image
+                    )
+            
+            return StreamingHttpResponse(relay(), content_type='text/plain; charset=utf-8')
                 
         except Exception as e:
             return JsonResponse({'error': f"Error: {str(e)}"}, status=500)
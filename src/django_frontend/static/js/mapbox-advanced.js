@@ -11,8 +11,17 @@ const DroneMapbox = {
     config: {
         terrainSource: 'mapbox-dem',
         terrainExaggeration: 1.5,
+        // Más allá de z12 el detalle extra del DEM no se aprecia con esta exageración
+        terrainMaxZoom: 12,
         defaultMapStyle: 'mapbox://styles/mapbox/dark-v11',
         satelliteMapStyle: 'mapbox://styles/mapbox/satellite-streets-v12',
+        // Estilos disponibles por tipo, resueltos una sola vez
+        mapStyles: {
+            default: 'mapbox://styles/mapbox/dark-v11',
+            satellite: 'mapbox://styles/mapbox/satellite-streets-v12',
+            night: 'mapbox://styles/mapbox/navigation-night-v1',
+            terrain: 'mapbox://styles/mapbox/outdoors-v12'
+        },
         dronePathColor: '#00e5ff',
         droneIconSize: 0.75,
         heatmapColors: [
@@ -60,20 +69,9 @@ const DroneMapbox = {
             trackUserLocation: true
         }));
         
-        // Cuando el mapa carga, añadimos fuente de terreno 3D
+        // Cuando el mapa carga, añadimos la niebla; el terreno 3D se carga tras el primer pintado
         map.on('load', () => {
-            map.addSource('mapbox-dem', {
-                'type': 'raster-dem',
-                'url': 'mapbox://mapbox.mapbox-terrain-dem-v1',
-                'tileSize': 512,
-                'maxzoom': 14
-            });
-            
-            // Activamos terreno 3D
-            map.setTerrain({ 
-                'source': this.config.terrainSource, 
-                'exaggeration': this.config.terrainExaggeration 
-            });
+            map.once('idle', () => this.addTerrain(map));
             
             // Añadimos niebla atmosférica
             map.setFog({
@@ -94,39 +92,31 @@ const DroneMapbox = {
      * @param {string} styleType - Tipo de estilo ('default', 'satellite', 'night', 'terrain')
      */
     changeMapStyle: function(map, styleType) {
-        let styleUrl;
-        
-        switch(styleType) {
-            case 'satellite':
-                styleUrl = this.config.satelliteMapStyle;
-                break;
-            case 'night':
-                styleUrl = 'mapbox://styles/mapbox/navigation-night-v1';
-                break;
-            case 'terrain':
-                styleUrl = 'mapbox://styles/mapbox/outdoors-v12';
-                break;
-            default:
-                styleUrl = this.config.defaultMapStyle;
-        }
+        const styleUrl = this.config.mapStyles[styleType] || this.config.mapStyles.default;
         
         map.setStyle(styleUrl);
         
         // Volvemos a configurar el terreno después del cambio de estilo
-        map.once('styledata', () => {
-            if (!map.getSource('mapbox-dem')) {
-                map.addSource('mapbox-dem', {
-                    'type': 'raster-dem',
-                    'url': 'mapbox://mapbox.mapbox-terrain-dem-v1',
-                    'tileSize': 512,
-                    'maxzoom': 14
-                });
-                
-                map.setTerrain({ 
-                    'source': this.config.terrainSource, 
-                    'exaggeration': this.config.terrainExaggeration 
-                });
-            }
+        map.once('styledata', () => this.addTerrain(map));
+    },
+    
+    /**
+     * Añade la fuente DEM y activa el terreno 3D si aún no existe
+     * @param {Object} map - Instancia del mapa
+     */
+    addTerrain: function(map) {
+        if (map.getSource(this.config.terrainSource)) return;
+        
+        map.addSource(this.config.terrainSource, {
+            'type': 'raster-dem',
+            'url': 'mapbox://mapbox.mapbox-terrain-dem-v1',
+            'tileSize': 512,
+            'maxzoom': this.config.terrainMaxZoom
+        });
+        
+        map.setTerrain({ 
+            'source': this.config.terrainSource, 
+            'exaggeration': this.config.terrainExaggeration 
         });
     },
     
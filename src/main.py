@@ -60,11 +60,18 @@ def main():
     
     # Start the FastAPI server
     logger.info("Launching uvicorn server...")
+    # Sessions are kept in process memory, so default to a single worker
+    workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
     uvicorn.run(
         module_path,
         host="0.0.0.0",
         port=8000,
-        log_level="info"
+        # "auto" picks uvloop/httptools when installed (not available on Windows)
+        loop=os.environ.get("UVICORN_LOOP", "auto"),
+        http=os.environ.get("UVICORN_HTTP", "auto"),
+        workers=workers,
+        log_level="info",
+        access_log=os.environ.get("UVICORN_ACCESS_LOG", "1") == "1"
     )
 
 if __name__ == "__main__":
@@ -5,14 +5,17 @@ Proporciona modelos ORM y funcionalidad de persistencia.
 
 import os
 import json
-from typing import Dict, Any, Optional, List, Union
+import time
+from typing import Dict, Any, Optional, List, Union, Iterator
 from datetime import datetime
+import numpy as np
 from sqlalchemy import (
-    create_engine, Column, Integer, String, Float, 
-    DateTime, ForeignKey, JSON, Boolean, Text, inspect
+    create_engine, event, Column, Integer, String, Float, 
+    DateTime, ForeignKey, JSON, Boolean, Text, Index, inspect, select, delete, insert
 )
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker, Session
+from sqlalchemy.orm import relationship, sessionmaker, Session, selectinload
+from pydantic import BaseModel, ConfigDict, Field, computed_field
 import logging
 from dotenv import load_dotenv
 
@@ -26,10 +29,40 @@ logger = logging.getLogger(__name__)
 # Determinar URL de base de datos desde variables de entorno o usar SQLite por defecto
 DB_URL = os.getenv("DATABASE_URL", "sqlite:///./data/drone_osint.db")
 
+# Umbral a partir del cual se registran consultas lentas (segundos)
+SLOW_QUERY_THRESHOLD = float(os.getenv("DB_SLOW_QUERY_THRESHOLD", "0.1"))
+
+def _engine_options(db_url: str) -> Dict[str, Any]:
+    """Opciones del pool de conexiones según el motor de base de datos."""
+    if db_url.startswith("sqlite"):
+        # SQLite: permitir compartir conexiones del pool entre los hilos de uvicorn
+        return {
+            "connect_args": {"check_same_thread": False},
+            "pool_pre_ping": True
+        }
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_pre_ping": True,
+        "pool_recycle": 1800
+    }
+
 # Crear base y motor de base de datos
 Base = declarative_base()
-engine = create_engine(DB_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_engine(DB_URL, **_engine_options(DB_URL))
+
+@event.listens_for(engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+@event.listens_for(engine, "after_cursor_execute")
+def _log_slow_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    if elapsed >= SLOW_QUERY_THRESHOLD:
+        logger.warning(f"Consulta lenta ({elapsed * 1000:.0f} ms): {statement}")
+
+# expire_on_commit=False: los objetos siguen siendo utilizables tras el commit sin recargarlos
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 class Analysis(Base):
     """Modelo para almacenar resultados de análisis de imágenes."""
@@ -45,7 +78,8 @@ class Analysis(Base):
     status = Column(String(50), default="created")
     
     # Datos de análisis
-    metadata = Column(JSON, nullable=True)
+    # "metadata" está reservado por la API declarativa (Base.metadata); la columna conserva el nombre
+    meta = Column("metadata", JSON, nullable=True)
     llm_analysis = Column(JSON, nullable=True)
     geo_data = Column(JSON, nullable=True)
     
@@ -56,31 +90,18 @@ class Analysis(Base):
     city = Column(String(100), nullable=True)
     confidence = Column(String(50), nullable=True)
     
+    # Índices para la paginación por fecha y las búsquedas por image_id + estado
+    __table_args__ = (
+        Index("ix_analyses_created_at_desc", created_at.desc()),
+        Index("ix_analyses_image_id_status", image_id, status),
+    )
+    
     # Relaciones
     detections = relationship("Detection", back_populates="analysis", cascade="all, delete-orphan")
     
     def to_dict(self) -> Dict[str, Any]:
         """Convierte el modelo a un diccionario."""
-        return {
-            "id": self.id,
-            "image_id": self.image_id,
-            "filename": self.filename,
-            "file_path": self.file_path,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-            "status": self.status,
-            "metadata": self.metadata,
-            "llm_analysis": self.llm_analysis,
-            "geo_data": self.geo_data,
-            "coordinates": {
-                "latitude": self.latitude,
-                "longitude": self.longitude
-            } if self.latitude and self.longitude else None,
-            "country": self.country,
-            "city": self.city,
-            "confidence": self.confidence,
-            "detections": [d.to_dict() for d in self.detections] if self.detections else []
-        }
+        return AnalysisOut.model_validate(self).model_dump(mode="json")
 
 class Detection(Base):
     """Modelo para almacenar detecciones de objetos en una imagen."""
@@ -101,13 +122,7 @@ class Detection(Base):
     
     def to_dict(self) -> Dict[str, Any]:
         """Convierte el modelo a un diccionario."""
-        return {
-            "id": self.id,
-            "analysis_id": self.analysis_id,
-            "object_class": self.object_class,
-            "confidence": self.confidence,
-            "bbox": [self.bbox_x1, self.bbox_y1, self.bbox_x2, self.bbox_y2]
-        }
+        return DetectionOut.model_validate(self).model_dump(mode="json")
 
 class VideoAnalysis(Base):
     """Modelo para almacenar análisis de videos."""
@@ -128,25 +143,17 @@ class VideoAnalysis(Base):
     fps = Column(Float, nullable=True)
     resolution = Column(String(50), nullable=True)
     
+    # Índice para la paginación por fecha
+    __table_args__ = (
+        Index("ix_video_analyses_created_at_desc", created_at.desc()),
+    )
+    
     # Relaciones
     frames = relationship("VideoFrame", back_populates="video", cascade="all, delete-orphan")
     
     def to_dict(self) -> Dict[str, Any]:
         """Convierte el modelo a un diccionario."""
-        return {
-            "id": self.id,
-            "video_id": self.video_id,
-            "filename": self.filename,
-            "file_path": self.file_path,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-            "status": self.status,
-            "duration": self.duration,
-            "frame_count": self.frame_count,
-            "fps": self.fps,
-            "resolution": self.resolution,
-            "frames": [f.to_dict() for f in self.frames] if self.frames else []
-        }
+        return VideoAnalysisOut.model_validate(self).model_dump(mode="json")
 
 class VideoFrame(Base):
     """Modelo para almacenar fotogramas extraídos de videos."""
@@ -162,7 +169,8 @@ class VideoFrame(Base):
     
     # Análisis del fotograma
     analyzed = Column(Boolean, default=False)
-    metadata = Column(JSON, nullable=True)
+    # "metadata" está reservado por la API declarativa (Base.metadata); la columna conserva el nombre
+    meta = Column("metadata", JSON, nullable=True)
     llm_analysis = Column(JSON, nullable=True)
     geo_data = Column(JSON, nullable=True)
     
@@ -176,23 +184,7 @@ class VideoFrame(Base):
     
     def to_dict(self) -> Dict[str, Any]:
         """Convierte el modelo a un diccionario."""
-        return {
-            "id": self.id,
-            "video_id": self.video_id,
-            "frame_number": self.frame_number,
-            "timestamp": self.timestamp,
-            "file_path": self.file_path,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "analyzed": self.analyzed,
-            "metadata": self.metadata,
-            "llm_analysis": self.llm_analysis,
-            "geo_data": self.geo_data,
-            "coordinates": {
-                "latitude": self.latitude,
-                "longitude": self.longitude
-            } if self.latitude and self.longitude else None,
-            "detections": [d.to_dict() for d in self.detections] if self.detections else []
-        }
+        return VideoFrameOut.model_validate(self).model_dump(mode="json")
 
 class FrameDetection(Base):
     """Modelo para almacenar detecciones de objetos en fotogramas de video."""
@@ -213,13 +205,170 @@ class FrameDetection(Base):
     
     def to_dict(self) -> Dict[str, Any]:
         """Convierte el modelo a un diccionario."""
-        return {
-            "id": self.id,
-            "frame_id": self.frame_id,
-            "object_class": self.object_class,
-            "confidence": self.confidence,
-            "bbox": [self.bbox_x1, self.bbox_y1, self.bbox_x2, self.bbox_y2]
+        return FrameDetectionOut.model_validate(self).model_dump(mode="json")
+
+# Esquemas de salida (Pydantic v2): la serialización la hace pydantic-core en lugar de
+# diccionarios construidos a mano en Python.
+
+class _BBoxOut(BaseModel):
+    """Campos comunes de una detección con su caja delimitadora."""
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: Optional[int] = None
+    object_class: Optional[str] = None
+    confidence: Optional[float] = None
+    bbox_x1: Optional[int] = Field(default=None, exclude=True)
+    bbox_y1: Optional[int] = Field(default=None, exclude=True)
+    bbox_x2: Optional[int] = Field(default=None, exclude=True)
+    bbox_y2: Optional[int] = Field(default=None, exclude=True)
+    
+    @computed_field
+    @property
+    def bbox(self) -> List[Optional[int]]:
+        return [self.bbox_x1, self.bbox_y1, self.bbox_x2, self.bbox_y2]
+
+class DetectionOut(_BBoxOut):
+    """Detección de objeto en una imagen."""
+    analysis_id: Optional[int] = None
+
+class FrameDetectionOut(_BBoxOut):
+    """Detección de objeto en un fotograma de video."""
+    frame_id: Optional[int] = None
+
+class _GeoAnalysisOut(BaseModel):
+    """Campos comunes de los análisis con datos JSON y coordenadas."""
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: Optional[int] = None
+    file_path: Optional[str] = None
+    created_at: Optional[datetime] = None
+    metadata: Optional[Any] = Field(default=None, validation_alias="meta")
+    llm_analysis: Optional[Any] = None
+    geo_data: Optional[Any] = None
+    latitude: Optional[float] = Field(default=None, exclude=True)
+    longitude: Optional[float] = Field(default=None, exclude=True)
+    
+    @computed_field
+    @property
+    def coordinates(self) -> Optional[Dict[str, float]]:
+        if self.latitude and self.longitude:
+            return {"latitude": self.latitude, "longitude": self.longitude}
+        return None
+
+class AnalysisOut(_GeoAnalysisOut):
+    """Análisis de imagen con sus detecciones."""
+    image_id: Optional[str] = None
+    filename: Optional[str] = None
+    updated_at: Optional[datetime] = None
+    status: Optional[str] = None
+    country: Optional[str] = None
+    city: Optional[str] = None
+    confidence: Optional[str] = None
+    detections: List[DetectionOut] = []
+
+class VideoFrameOut(_GeoAnalysisOut):
+    """Fotograma de video con su análisis y detecciones."""
+    video_id: Optional[int] = None
+    frame_number: Optional[int] = None
+    timestamp: Optional[float] = None
+    analyzed: Optional[bool] = None
+    detections: List[FrameDetectionOut] = []
+
+class VideoAnalysisOut(BaseModel):
+    """Análisis de video con sus fotogramas."""
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: Optional[int] = None
+    video_id: Optional[str] = None
+    filename: Optional[str] = None
+    file_path: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    status: Optional[str] = None
+    duration: Optional[float] = None
+    frame_count: Optional[int] = None
+    fps: Optional[float] = None
+    resolution: Optional[str] = None
+    frames: List[VideoFrameOut] = []
+
+# Columnas escalares usadas en los listados de análisis
+_ANALYSIS_SUMMARY_COLUMNS = (
+    Analysis.id, Analysis.image_id, Analysis.filename, Analysis.status,
+    Analysis.latitude, Analysis.longitude, Analysis.country, Analysis.city,
+    Analysis.confidence, Analysis.created_at
+)
+
+def _analysis_summary(row) -> Dict[str, Any]:
+    """Convierte una fila escalar de Analysis en el diccionario de resumen usado en listados."""
+    latitude = row["latitude"]
+    longitude = row["longitude"]
+    created_at = row["created_at"]
+    return {
+        "id": row["id"],
+        "image_id": row["image_id"],
+        "filename": row["filename"],
+        "created_at": created_at.isoformat() if created_at else None,
+        "status": row["status"],
+        "coordinates": {
+            "latitude": latitude,
+            "longitude": longitude
+        } if latitude and longitude else None,
+        "country": row["country"],
+        "city": row["city"],
+        "confidence": row["confidence"]
+    }
+
+def _detection_rows(analysis_id: int, detections: Union[List[Dict[str, Any]], Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Construye las filas para el INSERT por lotes de detecciones.
+    
+    Args:
+        analysis_id: ID del análisis al que pertenecen
+        detections: Lista de diccionarios ({"class", "confidence", "bbox"}) o formato
+            columnar de un detector ({"boxes": (N, 4), "classes": (N,), "confidences": (N,)})
+            
+    Returns:
+        Lista de diccionarios con las columnas de Detection
+    """
+    if isinstance(detections, dict):
+        boxes = np.asarray(detections.get("boxes", []), dtype=np.int32).reshape(-1, 4)
+        classes = [str(c) for c in detections.get("classes", ["unknown"] * len(boxes))]
+        confidences = np.asarray(detections.get("confidences", np.zeros(len(boxes))), dtype=np.float64)
+    else:
+        boxes = np.asarray([d.get("bbox", [0, 0, 0, 0]) for d in detections], dtype=np.int32).reshape(-1, 4)
+        classes = [d.get("class", "unknown") for d in detections]
+        confidences = np.asarray([d.get("confidence", 0.0) for d in detections], dtype=np.float64)
+    
+    # tolist() convierte todas las cajas a enteros de Python en una sola pasada
+    return [
+        {
+            "analysis_id": analysis_id,
+            "object_class": object_class,
+            "confidence": confidence,
+            "bbox_x1": x1,
+            "bbox_y1": y1,
+            "bbox_x2": x2,
+            "bbox_y2": y2
         }
+        for object_class, confidence, (x1, y1, x2, y2) in zip(classes, confidences.tolist(), boxes.tolist())
+    ]
+
+def get_db() -> Iterator[Session]:
+    """
+    Dependencia de FastAPI: una sesión por petición, confirmada al terminar.
+    
+    Yields:
+        Sesión de SQLAlchemy compartida por todas las operaciones de la petición
+    """
+    session = SessionLocal()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
 
 class DBManager:
     """Gestor de base de datos para operaciones comunes."""
@@ -247,17 +396,19 @@ class DBManager:
         """
         return self.SessionLocal()
     
-    def save_analysis(self, analysis_data: Dict[str, Any]) -> Analysis:
+    def save_analysis(self, analysis_data: Dict[str, Any], session: Optional[Session] = None) -> Analysis:
         """
         Guarda o actualiza un análisis de imagen.
         
         Args:
             analysis_data: Datos del análisis
+            session: Sesión existente a reutilizar (p. ej. de get_db); si no se indica se abre una propia
             
         Returns:
             Objeto Analysis guardado
         """
-        session = self.get_session()
+        owns_session = session is None
+        session = session or self.get_session()
         try:
             # Obtener ID de imagen
             image_id = analysis_data.get("image_id")
@@ -275,7 +426,9 @@ class DBManager:
                     setattr(analysis, key, analysis_data[key])
             
             # Actualizar datos de análisis
-            for key in ["metadata", "llm_analysis", "geo_data"]:
+            if "metadata" in analysis_data:
+                analysis.meta = analysis_data["metadata"]
+            for key in ["llm_analysis", "geo_data"]:
                 if key in analysis_data:
                     setattr(analysis, key, analysis_data[key])
             
@@ -291,54 +444,60 @@ class DBManager:
                 analysis.city = geo_data.get("city")
                 analysis.confidence = geo_data.get("confidence")
             
+            session.add(analysis)
+            
             # Procesar detecciones si existen
             detections_data = analysis_data.get("detections", [])
             if detections_data:
-                # Limpiar detecciones existentes
-                for detection in analysis.detections:
-                    session.delete(detection)
+                # Asegurar que el análisis tiene id antes de referenciarlo
+                session.flush()
                 
-                # Crear nuevas detecciones
-                for det_data in detections_data:
-                    bbox = det_data.get("bbox", [0, 0, 0, 0])
-                    detection = Detection(
-                        object_class=det_data.get("class", "unknown"),
-                        confidence=det_data.get("confidence", 0.0),
-                        bbox_x1=bbox[0],
-                        bbox_y1=bbox[1],
-                        bbox_x2=bbox[2],
-                        bbox_y2=bbox[3]
-                    )
-                    analysis.detections.append(detection)
+                # Reemplazar las detecciones con un único DELETE y un INSERT por lotes
+                session.execute(delete(Detection).where(Detection.analysis_id == analysis.id))
+                detection_rows = _detection_rows(analysis.id, detections_data)
+                if detection_rows:
+                    session.execute(insert(Detection), detection_rows)
+                session.expire(analysis, ["detections"])
             
-            # Guardar cambios
-            session.add(analysis)
-            session.commit()
-            session.refresh(analysis)
+            # Guardar cambios (con sesión externa el commit lo hace quien la gestiona)
+            if owns_session:
+                session.commit()
+            else:
+                session.flush()
+            
+            # Recargar las detecciones nuevas mientras la sesión sigue abierta
+            if detections_data:
+                session.refresh(analysis, ["detections"])
             
             logger.info(f"Análisis guardado para image_id: {image_id}")
             return analysis
             
         except Exception as e:
-            session.rollback()
+            if owns_session:
+                session.rollback()
             logger.error(f"Error al guardar análisis: {str(e)}")
             raise
         finally:
-            session.close()
+            if owns_session:
+                session.close()
     
-    def get_analysis(self, image_id: str) -> Optional[Dict[str, Any]]:
+    def get_analysis(self, image_id: str, session: Optional[Session] = None) -> Optional[Dict[str, Any]]:
         """
         Obtiene un análisis por ID de imagen.
         
         Args:
             image_id: ID de la imagen
+            session: Sesión existente a reutilizar (p. ej. de get_db); si no se indica se abre una propia
             
         Returns:
             Datos del análisis o None si no existe
         """
-        session = self.get_session()
+        owns_session = session is None
+        session = session or self.get_session()
         try:
-            analysis = session.query(Analysis).filter_by(image_id=image_id).first()
+            analysis = session.query(Analysis).options(
+                selectinload(Analysis.detections)
+            ).filter_by(image_id=image_id).first()
             if not analysis:
                 return None
             
@@ -348,61 +507,95 @@ class DBManager:
             logger.error(f"Error al obtener análisis: {str(e)}")
             return None
         finally:
-            session.close()
+            if owns_session:
+                session.close()
     
-    def list_analyses(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+    def list_analyses(self, limit: int = 100, offset: int = 0, session: Optional[Session] = None) -> List[Dict[str, Any]]:
         """
-        Lista análisis paginados.
+        Lista análisis paginados (resumen sin metadatos, análisis ni detecciones).
         
         Args:
             limit: Límite de resultados
             offset: Desplazamiento para paginación
+            session: Sesión existente a reutilizar (p. ej. de get_db); si no se indica se abre una propia
             
         Returns:
             Lista de análisis
         """
-        session = self.get_session()
+        owns_session = session is None
+        session = session or self.get_session()
         try:
-            analyses = session.query(Analysis).order_by(
+            # Solo columnas escalares: sin hidratar blobs JSON ni construir objetos ORM.
+            # Para el detalle completo de un análisis usar get_analysis.
+            stmt = select(*_ANALYSIS_SUMMARY_COLUMNS).order_by(
                 Analysis.created_at.desc()
-            ).limit(limit).offset(offset).all()
+            ).limit(limit).offset(offset)
             
-            return [a.to_dict() for a in analyses]
+            return [_analysis_summary(row) for row in session.execute(stmt).mappings()]
             
         except Exception as e:
             logger.error(f"Error al listar análisis: {str(e)}")
             return []
+        finally:
+            if owns_session:
+                session.close()
+    
+    def iter_analyses(self, batch_size: int = 200) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre todos los análisis (resumen) en lotes, sin materializar la lista completa.
+        
+        Args:
+            batch_size: Número de filas obtenidas del cursor en cada lote
+            
+        Yields:
+            Resumen de cada análisis, del más reciente al más antiguo
+        """
+        session = self.get_session()
+        try:
+            stmt = select(*_ANALYSIS_SUMMARY_COLUMNS).order_by(
+                Analysis.created_at.desc()
+            ).execution_options(yield_per=batch_size)
+            
+            for row in session.execute(stmt).mappings():
+                yield _analysis_summary(row)
         finally:
             session.close()
     
-    def delete_analysis(self, image_id: str) -> bool:
+    def delete_analysis(self, image_id: str, session: Optional[Session] = None) -> bool:
         """
         Elimina un análisis por ID de imagen.
         
         Args:
             image_id: ID de la imagen
+            session: Sesión existente a reutilizar (p. ej. de get_db); si no se indica se abre una propia
             
         Returns:
             True si se eliminó correctamente, False en caso contrario
         """
-        session = self.get_session()
+        owns_session = session is None
+        session = session or self.get_session()
         try:
             analysis = session.query(Analysis).filter_by(image_id=image_id).first()
             if not analysis:
                 return False
             
             session.delete(analysis)
-            session.commit()
+            if owns_session:
+                session.commit()
+            else:
+                session.flush()
             
             logger.info(f"Análisis eliminado: {image_id}")
             return True
             
         except Exception as e:
-            session.rollback()
+            if owns_session:
+                session.rollback()
             logger.error(f"Error al eliminar análisis: {str(e)}")
             return False
         finally:
-            session.close()
+            if owns_session:
+                session.close()
     
     def check_db_connection(self) -> bool:
         """
@@ -420,14 +613,18 @@ class DBManager:
             logger.error(f"Error de conexión a la base de datos: {str(e)}")
             return False
     
-    def get_database_stats(self) -> Dict[str, Any]:
+    def get_database_stats(self, session: Optional[Session] = None) -> Dict[str, Any]:
         """
         Obtiene estadísticas de la base de datos.
         
+        Args:
+            session: Sesión existente a reutilizar; si no se indica se abre una propia
+        
         Returns:
             Diccionario con estadísticas
         """
-        session = self.get_session()
+        owns_session = session is None
+        session = session or self.get_session()
         try:
             stats = {
                 "analyses_count": session.query(Analysis).count(),
@@ -444,13 +641,9 @@ class DBManager:
             logger.error(f"Error al obtener estadísticas de la base de datos: {str(e)}")
             return {"error": str(e)}
         finally:
-            session.close()
+            if owns_session:
+                session.close()
 
-# Instancia global del gestor de base de datos
+# Instancia global del gestor de base de datos.
+# Las tablas se crean en el arranque de la API (lifespan), no al importar el módulo.
 db_manager = DBManager()
-
-# Crear tablas al importar el módulo
-try:
-    db_manager.create_tables()
-except Exception as e:
-    logger.error(f"Error al inicializar la base de datos: {str(e)}") 
\ No newline at end of file
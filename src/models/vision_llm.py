@@ -1,12 +1,19 @@
 import os
+import re
 import json
 import base64
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Union, Iterator, Tuple
 import time
 import datetime
 import sys
 import logging
 import io
+import asyncio
+import threading
+import hashlib
+import copy
+from collections import deque
+from functools import lru_cache
 from PIL import Image
 import google.generativeai as genai
 from dotenv import load_dotenv
@@ -18,6 +25,167 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+if "/app" in os.environ.get("PYTHONPATH", ""):
+    from utils.enhanced_cache import cache_manager
+else:
+    try:
+        from src.utils.enhanced_cache import cache_manager
+    except ImportError:
+        from utils.enhanced_cache import cache_manager
+
+# Gemini model used for all vision requests
+_MODEL_NAME = 'gemini-2.5-pro-exp-03-25'
+
+# Prompt used for the structured geolocation analysis
+_ANALYZE_PROMPT = """Analiza esta imagen y proporciona la siguiente información en formato JSON:
+        {
+            "description": "Descripción detallada del entorno físico",
+            "location": {
+                "country": "País probable",
+                "city": "Ciudad probable",
+                "neighborhood": "Barrio o área específica",
+                "street": "Calle o ubicación específica",
+                "coordinates": {
+                    "latitude": "Latitud aproximada",
+                    "longitude": "Longitud aproximada"
+                }
+            },
+            "architectural_features": [
+                "Lista de características arquitectónicas distintivas"
+            ],
+            "landscape_features": [
+                "Lista de características del paisaje"
+            ],
+            "confidence": "Nivel de confianza en la geolocalización (alto/medio/bajo)"
+        }
+
+        IMPORTANTE: 
+        - Enfócate SOLO en elementos arquitectónicos y geográficos
+        - NO incluyas análisis de personas
+        - Proporciona coordenadas aproximadas basadas en características visibles
+        - Indica el nivel de confianza en la geolocalización"""
+
+# Prompt template for free-form questions about an image
+_CHAT_PROMPT_TEMPLATE = """Analiza esta imagen y responde a la siguiente pregunta: {user_message}
+            
+            IMPORTANTE: 
+            - Enfócate SOLO en elementos arquitectónicos y geográficos
+            - NO incluyas análisis de personas
+            - Proporciona coordenadas aproximadas basadas en características visibles
+            - Indica el nivel de confianza en la geolocalización"""
+
+# Number with optional degree sign and hemisphere letter, e.g. "40.4168° N"
+_COORD_RE = re.compile(r"(-?\d+(?:\.\d+)?)\s*°?\s*([NSEW])?", re.IGNORECASE)
+
+_JSON_DECODER = json.JSONDecoder()
+
+# Longest side (px) and JPEG quality of the images uploaded to Gemini
+_MAX_IMAGE_SIDE = 1568
+_UPLOAD_JPEG_QUALITY = 85
+
+@lru_cache(maxsize=1)
+def _gemini_model(api_key: str) -> genai.GenerativeModel:
+    """Configure the Gemini SDK once and share the model (and its gRPC channel) process-wide."""
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(_MODEL_NAME)
+
+@lru_cache(maxsize=128)
+def _encode_file(image_path: str, mtime: float) -> str:
+    """Base64-encode a file; mtime is part of the cache key so edited files are re-read."""
+    with open(image_path, "rb") as image_file:
+        return base64.b64encode(image_file.read()).decode('utf-8')
+
+def _load_image(image: Union[str, bytes, Image.Image]) -> Image.Image:
+    """Return a PIL image from a path, raw bytes or an already opened image."""
+    if isinstance(image, Image.Image):
+        return image
+    if isinstance(image, (bytes, bytearray)):
+        return Image.open(io.BytesIO(image))
+    return Image.open(image)
+
+def _prepare_upload(image: Union[str, bytes, Image.Image]) -> Dict[str, Any]:
+    """Downscale an image to _MAX_IMAGE_SIDE and re-encode it as JPEG for the Gemini request."""
+    if isinstance(image, Image.Image):
+        image = image.copy()
+    else:
+        image = _load_image(image)
+        # Let the JPEG decoder skip the full-resolution decode when possible
+        image.draft("RGB", (_MAX_IMAGE_SIDE, _MAX_IMAGE_SIDE))
+    image.thumbnail((_MAX_IMAGE_SIDE, _MAX_IMAGE_SIDE), Image.Resampling.LANCZOS)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=_UPLOAD_JPEG_QUALITY)
+    return {"mime_type": "image/jpeg", "data": buffer.getvalue()}
+
+def _read_image_bytes(image: Union[str, bytes, Image.Image]) -> bytes:
+    """Return the raw bytes of a path or bytes input, or the pixel data of a PIL image."""
+    if isinstance(image, Image.Image):
+        return image.tobytes()
+    if isinstance(image, (bytes, bytearray)):
+        return bytes(image)
+    with open(image, "rb") as image_file:
+        return image_file.read()
+
+def _difference_hash(image: Image.Image) -> int:
+    """64-bit difference hash: near-identical frames differ in only a few bits."""
+    pixels = list(image.convert("L").resize((9, 8), Image.Resampling.BILINEAR).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+def _parse_coordinate(value: Any) -> float:
+    """Convert LLM coordinates such as '40.41° N', '-3.70' or 3.7 into a signed float."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _COORD_RE.search(str(value))
+    if not match:
+        return 0.0
+    number = float(match.group(1))
+    hemisphere = (match.group(2) or "").upper()
+    return -abs(number) if hemisphere in ("S", "W") else number
+
+class TokenBucket:
+    """
+    Token bucket rate limiter usable from both threads and coroutines.
+    """
+    
+    def __init__(self, rate_per_minute: int, capacity: Optional[int] = None):
+        """
+        Args:
+            rate_per_minute: Sustained number of calls allowed per minute
+            capacity: Maximum burst size (defaults to one minute worth of calls)
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _reserve(self) -> float:
+        """Take a token and return how long the caller has to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+    
+    def acquire(self):
+        """Block the current thread until a call is allowed."""
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+    
+    async def acquire_async(self):
+        """Wait without blocking the event loop until a call is allowed."""
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
 class VisionLLM:
     """
     Class to interact with Vision-capable LLMs (like OpenAI's GPT-4V) to analyze images
@@ -30,135 +198,187 @@ class VisionLLM:
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY not found in environment variables")
         
-        # Configure Gemini
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-pro-exp-03-25')
+        # Configure Gemini (shared across instances)
+        self.model = _gemini_model(self.api_key)
+        self.rate_limiter = TokenBucket(int(os.getenv('GEMINI_REQUESTS_PER_MINUTE', '60')))
+        
+        # Analyses keyed by the SHA-256 of the image content
+        self.analysis_cache = cache_manager.get_or_create_cache("llm_analysis", max_size=512, ttl_seconds=86400, stripes=8)
+        # Recent video frames as (difference hash, cache key) for near-duplicate lookups
+        self.frame_hash_distance = int(os.getenv('FRAME_HASH_MAX_DISTANCE', '4'))
+        self._recent_frames = deque(maxlen=256)
         logger.info("Gemini client initialized successfully")
 
+    @classmethod
+    def probe(cls) -> Tuple[bool, str]:
+        """
+        Check that the service could be constructed, without configuring the
+        Gemini client or allocating caches.
+        
+        Returns:
+            Tuple of (ok, error message; empty when ok)
+        """
+        if not os.getenv('GEMINI_API_KEY'):
+            return False, "GEMINI_API_KEY not found in environment variables"
+        for name, default in (('GEMINI_REQUESTS_PER_MINUTE', '60'), ('FRAME_HASH_MAX_DISTANCE', '4')):
+            try:
+                int(os.getenv(name, default))
+            except ValueError:
+                return False, f"{name} must be an integer"
+        return True, ""
+
     def encode_image(self, image_path: str) -> str:
         """Encode image to base64 string."""
         try:
-            with open(image_path, "rb") as image_file:
-                return base64.b64encode(image_file.read()).decode('utf-8')
+            return _encode_file(image_path, os.path.getmtime(image_path))
         except Exception as e:
             logger.error(f"Error encoding image: {str(e)}")
             raise
 
-    def analyze_image(self, image_path: str) -> Dict[str, Any]:
-        """Analyze image using Gemini Vision."""
+    def analyze_image(self, image_path: Union[str, bytes, Image.Image]) -> Dict[str, Any]:
+        """
+        Analyze image using Gemini Vision. Accepts a file path, raw bytes or a PIL image.
+        Identical images are answered from the analysis cache without calling Gemini.
+        """
         try:
-            # Load and prepare the image
-            image = Image.open(image_path)
+            image_data = _read_image_bytes(image_path)
+            cache_key = hashlib.sha256(image_data).hexdigest()
+            cached = self._cached_analysis(cache_key)
+            if cached is not None:
+                return cached
             
-            # Prepare the prompt
-            prompt = """Analiza esta imagen y proporciona la siguiente información en formato JSON:
-            {
-                "description": "Descripción detallada del entorno físico",
+            # Generate response
+            image = image_path if isinstance(image_path, Image.Image) else image_data
+            response = self.model.generate_content(self._analysis_request(image))
+            return self._store_analysis(cache_key, self._build_analysis(response.text))
+
+        except Exception as e:
+            logger.error(f"Error in analyze_image: {str(e)}")
+            return self._analysis_error(e)
+
+    async def analyze_image_async(self, image_path: Union[str, bytes, Image.Image]) -> Dict[str, Any]:
+        """Async variant of analyze_image using the non-blocking Gemini client."""
+        try:
+            # File read, hashing and the PIL decode/re-encode run off the event loop
+            image_data = await asyncio.to_thread(_read_image_bytes, image_path)
+            cache_key = await asyncio.to_thread(lambda: hashlib.sha256(image_data).hexdigest())
+            cached = self._cached_analysis(cache_key)
+            if cached is not None:
+                return cached
+            
+            image = image_path if isinstance(image_path, Image.Image) else image_data
+            request = await asyncio.to_thread(self._analysis_request, image)
+            response = await self.model.generate_content_async(request)
+            return self._store_analysis(cache_key, self._build_analysis(response.text))
+
+        except Exception as e:
+            logger.error(f"Error in analyze_image_async: {str(e)}")
+            return self._analysis_error(e)
+
+    def _cached_analysis(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of a cached analysis (callers add fields to the result) or None."""
+        cached = self.analysis_cache.get(cache_key)
+        return copy.deepcopy(cached) if cached is not None else None
+
+    def _store_analysis(self, cache_key: str, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Cache a successful analysis and return a copy the caller is free to modify."""
+        self.analysis_cache.set(cache_key, analysis)
+        return copy.deepcopy(analysis)
+
+    async def analyze_images(self, image_paths: List[str], max_concurrency: int = 4) -> List[Dict[str, Any]]:
+        """
+        Analyze several images concurrently.
+        
+        Args:
+            image_paths: Paths of the images (e.g. extracted video frames)
+            max_concurrency: Maximum number of Gemini requests in flight
+            
+        Returns:
+            Analysis results in the same order as image_paths
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def analyze_one(image_path: str) -> Dict[str, Any]:
+            async with semaphore:
+                await self.rate_limiter.acquire_async()
+                return await self.analyze_image_async(image_path)
+        
+        return await asyncio.gather(*(analyze_one(path) for path in image_paths))
+
+    def _analysis_request(self, image_path: Union[str, bytes, Image.Image]) -> List[Any]:
+        """Build the Gemini request contents (prompt + image) for an analysis."""
+        # Load, downscale and re-encode the image
+        image = _prepare_upload(image_path)
+        
+        return [_ANALYZE_PROMPT, image]
+
+    def _build_analysis(self, response_text: str) -> Dict[str, Any]:
+        """Parse the Gemini answer into the llm_analysis / geo_data structure."""
+        # Parse the response
+        try:
+            # Decode the first JSON object in the response
+            start_idx = response_text.find('{')
+            if start_idx == -1:
+                raise ValueError("No JSON found in response")
+            analysis_result, _ = _JSON_DECODER.raw_decode(response_text, start_idx)
+        except Exception as e:
+            logger.error(f"Error parsing Gemini response: {str(e)}")
+            analysis_result = {
+                "description": response_text,
                 "location": {
-                    "country": "País probable",
-                    "city": "Ciudad probable",
-                    "neighborhood": "Barrio o área específica",
-                    "street": "Calle o ubicación específica",
+                    "country": "Unknown",
+                    "city": "Unknown",
+                    "neighborhood": "Unknown",
+                    "street": "Unknown",
                     "coordinates": {
-                        "latitude": "Latitud aproximada",
-                        "longitude": "Longitud aproximada"
+                        "latitude": "0",
+                        "longitude": "0"
                     }
                 },
-                "architectural_features": [
-                    "Lista de características arquitectónicas distintivas"
-                ],
-                "landscape_features": [
-                    "Lista de características del paisaje"
-                ],
-                "confidence": "Nivel de confianza en la geolocalización (alto/medio/bajo)"
+                "architectural_features": [],
+                "landscape_features": [],
+                "confidence": "low"
             }
-            
-            IMPORTANTE: 
-            - Enfócate SOLO en elementos arquitectónicos y geográficos
-            - NO incluyas análisis de personas
-            - Proporciona coordenadas aproximadas basadas en características visibles
-            - Indica el nivel de confianza en la geolocalización"""
-
-            # Generate response
-            response = self.model.generate_content([prompt, image])
-            
-            # Parse the response
-            try:
-                # Extract JSON from the response
-                response_text = response.text
-                # Find the JSON part in the response
-                start_idx = response_text.find('{')
-                end_idx = response_text.rfind('}') + 1
-                if start_idx != -1 and end_idx != 0:
-                    json_str = response_text[start_idx:end_idx]
-                    # Parse the JSON
-                    import json
-                    analysis_result = json.loads(json_str)
-                else:
-                    raise ValueError("No JSON found in response")
-            except Exception as e:
-                logger.error(f"Error parsing Gemini response: {str(e)}")
-                analysis_result = {
-                    "description": response_text,
-                    "location": {
-                        "country": "Unknown",
-                        "city": "Unknown",
-                        "neighborhood": "Unknown",
-                        "street": "Unknown",
-                        "coordinates": {
-                            "latitude": "0",
-                            "longitude": "0"
-                        }
-                    },
-                    "architectural_features": [],
-                    "landscape_features": [],
-                    "confidence": "low"
-                }
 
-            return {
-                "llm_analysis": {
-                    "description": analysis_result.get("description", ""),
-                    "confidence": analysis_result.get("confidence", "low")
+        return {
+            "llm_analysis": {
+                "description": analysis_result.get("description", ""),
+                "confidence": analysis_result.get("confidence", "low")
+            },
+            "geo_data": {
+                "country": analysis_result.get("location", {}).get("country", "Unknown"),
+                "city": analysis_result.get("location", {}).get("city", "Unknown"),
+                "neighborhood": analysis_result.get("location", {}).get("neighborhood", "Unknown"),
+                "street": analysis_result.get("location", {}).get("street", "Unknown"),
+                "coordinates": {
+                    "latitude": _parse_coordinate(analysis_result.get("location", {}).get("coordinates", {}).get("latitude", "0")),
+                    "longitude": _parse_coordinate(analysis_result.get("location", {}).get("coordinates", {}).get("longitude", "0"))
                 },
-                "geo_data": {
-                    "country": analysis_result.get("location", {}).get("country", "Unknown"),
-                    "city": analysis_result.get("location", {}).get("city", "Unknown"),
-                    "neighborhood": analysis_result.get("location", {}).get("neighborhood", "Unknown"),
-                    "street": analysis_result.get("location", {}).get("street", "Unknown"),
-                    "coordinates": {
-                        "latitude": float(analysis_result.get("location", {}).get("coordinates", {}).get("latitude", "0").replace("°", "").replace("S", "-").replace("N", "").strip()),
-                        "longitude": float(analysis_result.get("location", {}).get("coordinates", {}).get("longitude", "0").replace("°", "").replace("W", "-").replace("E", "").strip())
-                    },
-                    "architectural_features": analysis_result.get("architectural_features", []),
-                    "landscape_features": analysis_result.get("landscape_features", [])
-                }
+                "architectural_features": analysis_result.get("architectural_features", []),
+                "landscape_features": analysis_result.get("landscape_features", [])
             }
+        }
 
-        except Exception as e:
-            logger.error(f"Error in analyze_image: {str(e)}")
-            return {
-                "llm_analysis": {
-                    "error": str(e)
-                },
-                "geo_data": {
-                    "error": str(e)
-                }
+    @staticmethod
+    def _analysis_error(error: Exception) -> Dict[str, Any]:
+        """Result returned when the analysis fails."""
+        return {
+            "llm_analysis": {
+                "error": str(error)
+            },
+            "geo_data": {
+                "error": str(error)
             }
+        }
 
     def chat_about_image(self, image_path: str, user_message: str) -> Dict[str, Any]:
         """Chat about an image using Gemini Vision."""
         try:
             # Load and prepare the image
-            image = Image.open(image_path)
+            image = _prepare_upload(image_path)
             
             # Prepare the prompt
-            prompt = f"""Analiza esta imagen y responde a la siguiente pregunta: {user_message}
-            
-            IMPORTANTE: 
-            - Enfócate SOLO en elementos arquitectónicos y geográficos
-            - NO incluyas análisis de personas
-            - Proporciona coordenadas aproximadas basadas en características visibles
-            - Indica el nivel de confianza en la geolocalización"""
+            prompt = self._chat_prompt(user_message)
 
             # Generate response
             response = self.model.generate_content([prompt, image])
@@ -177,6 +397,24 @@ class VisionLLM:
                 }
             }
     
+    def stream_chat_about_image(self, image_path: str, user_message: str) -> Iterator[str]:
+        """Chat about an image using Gemini Vision, yielding the answer as it is generated."""
+        try:
+            image = _prepare_upload(image_path)
+            prompt = self._chat_prompt(user_message)
+            
+            for chunk in self.model.generate_content([prompt, image], stream=True):
+                if chunk.text:
+                    yield chunk.text
+        except Exception as e:
+            logger.error(f"Error in stream_chat_about_image: {str(e)}")
+            yield f"\n[Error: {str(e)}]"
+    
+    @staticmethod
+    def _chat_prompt(user_message: str) -> str:
+        """Build the chat prompt for a user question about an image."""
+        return _CHAT_PROMPT_TEMPLATE.format(user_message=user_message)
+    
     def reset_conversation(self):
         """Reset the conversation history."""
         self.conversation_history = []
@@ -191,15 +429,35 @@ class VisionLLM:
         Returns:
             Dictionary with location information
         """
-        # Ensure we have bytes
+        # Read the frame once and analyze the in-memory bytes
         with open(video_frame_path, "rb") as f:
             image_data = f.read()
-            
-        return self.analyze_image(video_frame_path)
+        
+        # Reuse the analysis of a recent, visually near-identical frame
+        frame_hash = None
+        try:
+            frame_hash = _difference_hash(Image.open(io.BytesIO(image_data)))
+            for previous_hash, cache_key in reversed(self._recent_frames):
+                if bin(frame_hash ^ previous_hash).count("1") <= self.frame_hash_distance:
+                    cached = self._cached_analysis(cache_key)
+                    if cached is not None:
+                        return cached
+        except Exception as e:
+            logger.warning(f"Could not hash frame {video_frame_path}: {str(e)}")
+        
+        analysis = self.analyze_image(image_data)
+        if frame_hash is not None and "error" not in analysis.get("llm_analysis", {}):
+            self._recent_frames.append((frame_hash, hashlib.sha256(image_data).hexdigest()))
+        return analysis
     
     def rate_limit_check(self):
         """
         Implement rate limiting to avoid API quota issues.
-        Waits for a short period to avoid exceeding rate limits.
+        Waits only as long as needed to stay within GEMINI_REQUESTS_PER_MINUTE.
         """
-        time.sleep(1)  # Simple rate limiting strategy 
\ No newline at end of file
+        self.rate_limiter.acquire() 
+
+@lru_cache(maxsize=1)
+def get_vision_llm() -> VisionLLM:
+    """Return the process-wide VisionLLM instance, creating it on first use."""
+    return VisionLLM()
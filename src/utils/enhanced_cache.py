@@ -3,22 +3,59 @@ Sistema de caché avanzado con TTL y algoritmo LRU para Drone-OSINT-GeoSpy.
 """
 
 import time
+import heapq
+import itertools
 import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, Tuple, List, Set
+from typing import Dict, Any, Optional, Tuple, List, Set, Union
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Logging is configured by the application entry point (src/main.py)
 logger = logging.getLogger(__name__)
 
-class EnhancedCache:
+# Centinela para distinguir "clave ausente" de un valor None almacenado
+_MISSING = object()
+
+class AtomicCounter:
+    """
+    Contador sin cerrojo: next() sobre itertools.count es una única operación en C
+    y por tanto atómica bajo el GIL, a diferencia de `x += 1`.
+    """
+    
+    __slots__ = ("_count", "_reads", "_read_lock")
+    
+    def __init__(self):
+        """Inicializa el contador a cero."""
+        self._count = itertools.count()
+        # Valores de itertools.count consumidos por lecturas de value
+        self._reads = 0
+        self._read_lock = threading.Lock()
+    
+    def increment(self) -> None:
+        """Suma uno al contador."""
+        next(self._count)
+    
+    @property
+    def value(self) -> int:
+        """
+        Valor actual: cada lectura consume un valor del contador, que se descuenta.
+        Solo las lecturas (poco frecuentes) toman el cerrojo.
+        """
+        with self._read_lock:
+            value = next(self._count) - self._reads
+            self._reads += 1
+            return value
+
+class EnhancedCache(MutableMapping):
     """
     Implementación de caché avanzado con TTL (Time-To-Live) y algoritmo LRU (Least Recently Used).
-    Thread-safe para entornos concurrentes.
+    Thread-safe para entornos concurrentes. Admite también la interfaz de diccionario
+    (cache[key], key in cache, del cache[key], len(cache)).
     """
     
-    def __init__(self, name: str, max_size: int = 100, ttl_seconds: int = 3600):
+    def __init__(self, name: str, max_size: int = 100, ttl_seconds: int = 3600, verbose: bool = True):
         """
         Inicializa el caché con parámetros configurables.
         
@@ -26,46 +63,73 @@ class EnhancedCache:
             name: Nombre identificativo del caché
             max_size: Tamaño máximo del caché (entradas)
             ttl_seconds: Tiempo de vida de las entradas en segundos
+            verbose: Registrar creación y limpieza del caché (desactivado en las franjas de StripedCache)
         """
         self.name = name
-        self.cache: Dict[str, Any] = {}
-        self.access_times: Dict[str, float] = {}
-        self.creation_times: Dict[str, float] = {}
+        self._verbose = verbose
+        # clave -> (valor, instante de creación); el orden de inserción es el orden LRU
+        self.cache: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        # Montículo de (instante de expiración, clave); puede contener entradas obsoletas
+        self._expiry_heap: List[Tuple[float, str]] = []
         self.max_size = max_size
         self.ttl = ttl_seconds
         self.lock = threading.Lock()
-        self.hit_count = 0
-        self.miss_count = 0
-        logger.info(f"EnhancedCache '{name}' inicializado: max_size={max_size}, ttl={ttl_seconds}s")
+        self._hits = AtomicCounter()
+        self._misses = AtomicCounter()
+        # Campos fijos de get_stats, construidos una sola vez (mismo orden de claves que antes)
+        self._stats_base = {
+            "name": name,
+            "size": 0,
+            "max_size": max_size,
+            "ttl_seconds": ttl_seconds,
+            "hits": 0,
+            "misses": 0,
+            "hit_ratio": 0,
+            "entries": 0
+        }
+        if verbose:
+            logger.info(f"EnhancedCache '{name}' inicializado: max_size={max_size}, ttl={ttl_seconds}s")
     
-    def get(self, key: str) -> Optional[Any]:
+    def get(self, key: str, default: Any = None) -> Optional[Any]:
         """
         Obtiene un valor del caché. Actualiza estadísticas y tiempo de acceso.
         
         Args:
             key: Clave a buscar
+            default: Valor devuelto si la clave no existe o ha expirado
             
         Returns:
-            Valor almacenado o None si no existe o está expirado
+            Valor almacenado o default si no existe o está expirado
         """
         with self.lock:
-            if key not in self.cache:
-                self.miss_count += 1
-                return None
+            entry = self.cache.get(key)
+            if entry is None:
+                self._misses.increment()
+                return default
             
-            # Verificar si ha expirado
-            now = time.time()
-            if now - self.creation_times[key] > self.ttl:
+            value, created = entry
+            if time.monotonic() - created > self.ttl:
                 self._remove_entry(key)
-                self.miss_count += 1
-                logger.debug(f"Cache '{self.name}': expirada clave '{key}'")
-                return None
+                self._misses.increment()
+                logger.debug("Cache '%s': expirada clave '%s'", self.name, key)
+                return default
             
-            # Actualizar tiempo de acceso
-            self.access_times[key] = now
-            self.hit_count += 1
-            logger.debug(f"Cache '{self.name}': hit para clave '{key}'")
-            return self.cache[key]
+            self.cache.move_to_end(key)
+            self._hits.increment()
+            # Sin DEBUG activo el camino de acierto no llama al logger
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Cache '%s': hit para clave '%s'", self.name, key)
+            return value
+    
+    @property
+    def hit_count(self) -> int:
+        """Número de aciertos."""
+        return self._hits.value
+    
+    @property
+    def miss_count(self) -> int:
+        """Número de fallos."""
+        return self._misses.value
     
     def set(self, key: str, value: Any) -> None:
         """
@@ -81,11 +145,12 @@ class EnhancedCache:
                 self._evict_entries()
             
             # Almacenar nueva entrada
-            now = time.time()
-            self.cache[key] = value
-            self.access_times[key] = now
-            self.creation_times[key] = now
-            logger.debug(f"Cache '{self.name}': set para clave '{key}'")
+            now = time.monotonic()
+            self.cache[key] = (value, now)
+            self.cache.move_to_end(key)
+            self._push_expiry(key, now)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Cache '%s': set para clave '%s'", self.name, key)
     
     def _evict_entries(self) -> None:
         """
@@ -93,19 +158,49 @@ class EnhancedCache:
         Primero elimina entradas expiradas, luego las menos usadas recientemente.
         """
         # Eliminar entradas expiradas primero
-        now = time.time()
-        expired_keys = [k for k in self.cache.keys() 
-                        if now - self.creation_times[k] > self.ttl]
-        
-        for key in expired_keys:
-            self._remove_entry(key)
+        self._pop_expired(time.monotonic())
         
-        # Si aún necesitamos espacio, usar LRU
+        # Si aún necesitamos espacio, usar LRU: la primera entrada es la menos usada recientemente
         if len(self.cache) >= self.max_size:
-            # Encontrar la entrada menos usada recientemente
-            oldest_key = min(self.access_times.items(), key=lambda x: x[1])[0]
-            self._remove_entry(oldest_key)
-            logger.debug(f"Cache '{self.name}': LRU eviction para clave '{oldest_key}'")
+            oldest_key, _ = self.cache.popitem(last=False)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Cache '%s': LRU eviction para clave '%s'", self.name, oldest_key)
+    
+    def _push_expiry(self, key: str, created: float) -> None:
+        """
+        Registra la expiración de una entrada en el montículo.
+        
+        Args:
+            key: Clave almacenada
+            created: Instante de creación de la entrada
+        """
+        heapq.heappush(self._expiry_heap, (created + self.ttl, key))
+        
+        # Compactar cuando las entradas obsoletas (sobrescritas o desalojadas) dominan
+        if len(self._expiry_heap) > 2 * max(self.max_size, 1):
+            self._expiry_heap = [(c + self.ttl, k) for k, (_, c) in self.cache.items()]
+            heapq.heapify(self._expiry_heap)
+    
+    def _pop_expired(self, now: float) -> int:
+        """
+        Elimina las entradas expiradas extrayendo solo la cabeza vencida del montículo.
+        
+        Args:
+            now: Instante actual
+            
+        Returns:
+            Número de entradas eliminadas
+        """
+        removed = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] < now:
+            expiry, key = heapq.heappop(heap)
+            entry = self.cache.get(key)
+            # Ignorar entradas del montículo que ya no corresponden a la clave actual
+            if entry is not None and entry[1] + self.ttl == expiry:
+                self._remove_entry(key)
+                removed += 1
+        return removed
     
     def _remove_entry(self, key: str) -> None:
         """
@@ -115,17 +210,40 @@ class EnhancedCache:
             key: Clave a eliminar
         """
         self.cache.pop(key, None)
-        self.access_times.pop(key, None)
-        self.creation_times.pop(key, None)
     
     def clear(self) -> None:
         """Limpia completamente el caché."""
         with self.lock:
             self.cache.clear()
-            self.access_times.clear()
-            self.creation_times.clear()
+            self._expiry_heap.clear()
+        if self._verbose:
             logger.info(f"Cache '{self.name}': limpiado completamente")
     
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+    
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.set(key, value)
+    
+    def __delitem__(self, key: str) -> None:
+        with self.lock:
+            if self.cache.pop(key, _MISSING) is _MISSING:
+                raise KeyError(key)
+    
+    def __contains__(self, key: object) -> bool:
+        return self.contains(key)
+    
+    def __len__(self) -> int:
+        return len(self.cache)
+    
+    def __iter__(self):
+        # Instantánea de las claves (puede incluir entradas expiradas aún no eliminadas)
+        with self.lock:
+            return iter(list(self.cache))
+    
     def get_stats(self) -> Dict[str, Any]:
         """
         Obtiene estadísticas del rendimiento del caché.
@@ -133,20 +251,19 @@ class EnhancedCache:
         Returns:
             Diccionario con estadísticas (hits, misses, ratio, etc.)
         """
-        with self.lock:
-            total = self.hit_count + self.miss_count
-            hit_ratio = self.hit_count / total if total > 0 else 0
-            
-            return {
-                "name": self.name,
-                "size": len(self.cache),
-                "max_size": self.max_size,
-                "ttl_seconds": self.ttl,
-                "hits": self.hit_count,
-                "misses": self.miss_count,
-                "hit_ratio": hit_ratio,
-                "entries": len(self.cache)
-            }
+        # Sin cerrojo: len() y los contadores atómicos son lecturas consistentes bajo el GIL
+        hits = self.hit_count
+        misses = self.miss_count
+        total = hits + misses
+        size = len(self.cache)
+        
+        stats = self._stats_base.copy()
+        stats["size"] = size
+        stats["hits"] = hits
+        stats["misses"] = misses
+        stats["hit_ratio"] = hits / total if total > 0 else 0
+        stats["entries"] = size
+        return stats
     
     def cleanup_expired(self) -> int:
         """
@@ -156,14 +273,7 @@ class EnhancedCache:
             Número de entradas eliminadas
         """
         with self.lock:
-            now = time.time()
-            expired_keys = [k for k in self.cache.keys() 
-                           if now - self.creation_times[k] > self.ttl]
-            
-            for key in expired_keys:
-                self._remove_entry(key)
-            
-            return len(expired_keys)
+            return self._pop_expired(time.monotonic())
     
     def contains(self, key: str) -> bool:
         """
@@ -180,12 +290,105 @@ class EnhancedCache:
                 return False
             
             # Verificar si ha expirado
-            now = time.time()
-            if now - self.creation_times[key] > self.ttl:
+            now = time.monotonic()
+            if now - self.cache[key][1] > self.ttl:
                 return False
             
             return True
 
+class StripedCache(MutableMapping):
+    """
+    Caché repartido en N franjas (EnhancedCache independientes, cada una con su cerrojo).
+    Cada clave va siempre a la misma franja, así que los accesos a claves distintas
+    rara vez compiten por el mismo cerrojo. El LRU es aproximado: se aplica por franja.
+    """
+    
+    def __init__(self, name: str, max_size: int = 100, ttl_seconds: int = 3600, stripes: int = 8):
+        """
+        Inicializa las franjas del caché.
+        
+        Args:
+            name: Nombre identificativo del caché
+            max_size: Tamaño máximo total (se reparte entre las franjas)
+            ttl_seconds: Tiempo de vida de las entradas en segundos
+            stripes: Número de franjas (se redondea a potencia de 2)
+        """
+        stripes = 1 << max(stripes - 1, 0).bit_length()
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self._mask = stripes - 1
+        stripe_size = max(1, max_size // stripes)
+        self._stripes = [
+            EnhancedCache(name, stripe_size, ttl_seconds, verbose=False)
+            for _ in range(stripes)
+        ]
+        logger.info(f"StripedCache '{name}' inicializado: max_size={max_size}, ttl={ttl_seconds}s, franjas={stripes}")
+    
+    def _stripe(self, key: str) -> EnhancedCache:
+        """Devuelve la franja que almacena la clave."""
+        return self._stripes[hash(key) & self._mask]
+    
+    def get(self, key: str, default: Any = None) -> Optional[Any]:
+        """Obtiene un valor del caché o default si no existe o está expirado."""
+        return self._stripe(key).get(key, default)
+    
+    def set(self, key: str, value: Any) -> None:
+        """Almacena un valor en el caché."""
+        self._stripe(key).set(key, value)
+    
+    def contains(self, key: str) -> bool:
+        """Verifica si una clave existe en el caché y no ha expirado."""
+        return self._stripe(key).contains(key)
+    
+    def __getitem__(self, key: str) -> Any:
+        return self._stripe(key)[key]
+    
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._stripe(key).set(key, value)
+    
+    def __delitem__(self, key: str) -> None:
+        del self._stripe(key)[key]
+    
+    def __contains__(self, key: object) -> bool:
+        return self._stripe(key).contains(key)
+    
+    def __len__(self) -> int:
+        return sum(len(stripe) for stripe in self._stripes)
+    
+    def __iter__(self):
+        return itertools.chain.from_iterable(iter(stripe) for stripe in self._stripes)
+    
+    def clear(self) -> None:
+        """Limpia completamente el caché."""
+        for stripe in self._stripes:
+            stripe.clear()
+        logger.info(f"Cache '{self.name}': limpiado completamente")
+    
+    def cleanup_expired(self) -> int:
+        """Elimina las entradas expiradas de todas las franjas."""
+        return sum(stripe.cleanup_expired() for stripe in self._stripes)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas agregadas de todas las franjas."""
+        stripe_stats = [stripe.get_stats() for stripe in self._stripes]
+        hits = sum(stats["hits"] for stats in stripe_stats)
+        misses = sum(stats["misses"] for stats in stripe_stats)
+        size = sum(stats["size"] for stats in stripe_stats)
+        total = hits + misses
+        
+        return {
+            "name": self.name,
+            "size": size,
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / total if total > 0 else 0,
+            "entries": size,
+            "stripes": len(self._stripes)
+        }
+
 class CacheManager:
     """
     Gestor centralizado para todos los cachés de la aplicación.
@@ -194,12 +397,14 @@ class CacheManager:
     
     def __init__(self):
         """Inicializa el gestor de cachés."""
-        self.caches: Dict[str, EnhancedCache] = {}
+        self.caches: Dict[str, Union[EnhancedCache, StripedCache]] = {}
         self.cleanup_thread = None
         self.is_running = False
+        self._stop_event = threading.Event()
         self.lock = threading.Lock()
     
-    def get_or_create_cache(self, name: str, max_size: int = 100, ttl_seconds: int = 3600) -> EnhancedCache:
+    def get_or_create_cache(self, name: str, max_size: int = 100, ttl_seconds: int = 3600,
+                            stripes: int = 1) -> Union[EnhancedCache, StripedCache]:
         """
         Obtiene un caché existente o crea uno nuevo.
         
@@ -207,13 +412,22 @@ class CacheManager:
             name: Nombre del caché
             max_size: Tamaño máximo del caché
             ttl_seconds: Tiempo de vida de las entradas
+            stripes: Número de franjas con cerrojo propio (>1 para cachés grandes muy concurridos)
             
         Returns:
-            Instancia de EnhancedCache
+            Instancia de EnhancedCache, o StripedCache si stripes > 1
         """
+        # Camino rápido sin cerrojo: la lectura de un dict es atómica y el caché casi siempre existe
+        cache = self.caches.get(name)
+        if cache is not None:
+            return cache
+        
         with self.lock:
             if name not in self.caches:
-                self.caches[name] = EnhancedCache(name, max_size, ttl_seconds)
+                if stripes > 1:
+                    self.caches[name] = StripedCache(name, max_size, ttl_seconds, stripes)
+                else:
+                    self.caches[name] = EnhancedCache(name, max_size, ttl_seconds)
             return self.caches[name]
     
     def get_all_stats(self) -> Dict[str, Dict[str, Any]]:
@@ -223,11 +437,11 @@ class CacheManager:
         Returns:
             Diccionario con estadísticas por caché
         """
-        stats = {}
         with self.lock:
-            for name, cache in self.caches.items():
-                stats[name] = cache.get_stats()
-        return stats
+            caches = list(self.caches.items())
+        
+        # Cada caché usa su propio cerrojo; el del gestor solo protege el registro
+        return {name: cache.get_stats() for name, cache in caches}
     
     def start_cleanup_thread(self, interval_seconds: int = 300) -> None:
         """
@@ -240,6 +454,7 @@ class CacheManager:
             return
         
         self.is_running = True
+        self._stop_event.clear()
         self.cleanup_thread = threading.Thread(
             target=self._cleanup_loop,
             args=(interval_seconds,),
@@ -251,6 +466,7 @@ class CacheManager:
     def stop_cleanup_thread(self) -> None:
         """Detiene el hilo de limpieza."""
         self.is_running = False
+        self._stop_event.set()
         if self.cleanup_thread:
             self.cleanup_thread.join(timeout=1.0)
             logger.info("Detenido hilo de limpieza de caché")
@@ -262,16 +478,20 @@ class CacheManager:
         Args:
             interval_seconds: Intervalo de limpieza en segundos
         """
-        while self.is_running:
+        while not self._stop_event.is_set():
             try:
-                time.sleep(interval_seconds)
+                # Espera interrumpible: stop_cleanup_thread la despierta al instante
+                if self._stop_event.wait(interval_seconds):
+                    break
                 
                 with self.lock:
-                    total_cleaned = 0
-                    for name, cache in self.caches.items():
-                        removed = cache.cleanup_expired()
-                        total_cleaned += removed
-                        
+                    caches = list(self.caches.values())
+                
+                # Barrido sin el cerrojo del gestor para no bloquear get_or_create_cache
+                total_cleaned = 0
+                for cache in caches:
+                    total_cleaned += cache.cleanup_expired()
+                
                 if total_cleaned > 0:
                     logger.info(f"Limpieza de caché: eliminadas {total_cleaned} entradas expiradas")
                     
@@ -281,9 +501,11 @@ class CacheManager:
     def clear_all_caches(self) -> None:
         """Limpia todos los cachés."""
         with self.lock:
-            for cache in self.caches.values():
-                cache.clear()
-            logger.info("Limpiados todos los cachés")
+            caches = list(self.caches.values())
+        
+        for cache in caches:
+            cache.clear()
+        logger.info("Limpiados todos los cachés")
 
 # Instancia global del gestor de cachés
 cache_manager = CacheManager() 
\ No newline at end of file
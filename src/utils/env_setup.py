@@ -3,14 +3,23 @@ import sys
 import shutil
 import logging
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Logging is configured by the application entry point (src/main.py)
 logger = logging.getLogger('env_setup')
 
+# Set once setup_env_file has run in this process
+_configured = False
+
 def setup_env_file():
     """
     Copy the .env.example file to .env if .env doesn't exist.
     This helps users get started quickly with the correct environment variables.
+    Only the first call in a process does any work.
     """
+    global _configured
+    if _configured:
+        return
+    _configured = True
+    
     # Determine the project root directory
     script_dir = os.path.dirname(os.path.abspath(__file__))
     
@@ -37,12 +46,15 @@ def setup_env_file():
     
     # Copy .env.example to .env
     try:
-        shutil.copy2(env_example_file, env_file)
+        shutil.copyfile(env_example_file, env_file)
+        # .env holds API keys: owner read/write only
+        os.chmod(env_file, 0o600)
         logger.info(f".env file created from .env.example. Please update it with your API keys.")
         logger.info(f"File location: {env_file}")
     except Exception as e:
         logger.error(f"Failed to create .env file: {e}")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     setup_env_file()
     print("Environment setup complete!") 
\ No newline at end of file
@@ -4,7 +4,7 @@ Proporciona clases base para excepciones y funciones para manejo de errores.
 """
 
 from fastapi import Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from pydantic import ValidationError
 from typing import Dict, Any, Optional, Type, List, Callable
@@ -14,8 +14,7 @@ import sys
 import json
 import os
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Logging is configured by the application entry point (src/main.py)
 logger = logging.getLogger(__name__)
 
 class APIException(Exception):
@@ -24,6 +23,9 @@ class APIException(Exception):
     Proporciona una estructura consistente para todos los errores.
     """
     
+    # Atributos en slots: no se crea un __dict__ por cada excepción lanzada
+    __slots__ = ("status_code", "error_code", "message", "details", "_payload")
+    
     def __init__(
         self, 
         status_code: int = 500, 
@@ -45,29 +47,32 @@ class APIException(Exception):
         self.message = message
         self.details = details or {}
         super().__init__(self.message)
-    
-    def to_dict(self) -> Dict[str, Any]:
-        """
-        Convierte la excepción a un diccionario para respuesta JSON.
         
-        Returns:
-            Diccionario con información del error
-        """
-        error_dict = {
+        # El contenido no cambia tras la construcción: se calcula una sola vez
+        self._payload = {
             "status": "error",
             "error_code": self.error_code,
             "message": self.message
         }
         
         if self.details:
-            error_dict["details"] = self.details
-            
-        return error_dict
+            self._payload["details"] = self.details
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convierte la excepción a un diccionario para respuesta JSON.
+        
+        Returns:
+            Diccionario con información del error (precalculado en __init__)
+        """
+        return self._payload
 
 # Excepciones específicas comunes
 class NotFoundError(APIException):
     """Excepción para recursos no encontrados."""
     
+    __slots__ = ()
+    
     def __init__(
         self, 
         message: str = "Recurso no encontrado", 
@@ -100,6 +105,8 @@ class NotFoundError(APIException):
 class ValidationError(APIException):
     """Excepción para errores de validación."""
     
+    __slots__ = ()
+    
     def __init__(
         self, 
         message: str = "Error de validación", 
@@ -128,6 +135,8 @@ class ValidationError(APIException):
 class AuthorizationError(APIException):
     """Excepción para errores de autorización."""
     
+    __slots__ = ()
+    
     def __init__(
         self, 
         message: str = "No autorizado", 
@@ -149,6 +158,8 @@ class AuthorizationError(APIException):
 class ForbiddenError(APIException):
     """Excepción para acciones prohibidas."""
     
+    __slots__ = ()
+    
     def __init__(
         self, 
         message: str = "Acceso prohibido", 
@@ -170,6 +181,8 @@ class ForbiddenError(APIException):
 class ServiceUnavailableError(APIException):
     """Excepción para servicios no disponibles."""
     
+    __slots__ = ()
+    
     def __init__(
         self, 
         message: str = "Servicio no disponible", 
@@ -198,6 +211,8 @@ class ServiceUnavailableError(APIException):
 class RateLimitError(APIException):
     """Excepción para límite de tasa excedido."""
     
+    __slots__ = ()
+    
     def __init__(
         self, 
         message: str = "Límite de tasa excedido", 
@@ -226,6 +241,8 @@ class RateLimitError(APIException):
 class BadRequestError(APIException):
     """Excepción para solicitudes incorrectas."""
     
+    __slots__ = ()
+    
     def __init__(
         self, 
         message: str = "Solicitud incorrecta", 
@@ -248,7 +265,7 @@ class BadRequestError(APIException):
         )
 
 # Manejadores de excepciones para FastAPI
-async def api_exception_handler(request: Request, exc: APIException) -> JSONResponse:
+async def api_exception_handler(request: Request, exc: APIException) -> ORJSONResponse:
     """
     Manejador de APIException para FastAPI.
     
@@ -262,21 +279,21 @@ async def api_exception_handler(request: Request, exc: APIException) -> JSONResp
     # Registrar error en el log
     if exc.status_code >= 500:
         logger.error(
-            f"API Error {exc.status_code} ({exc.error_code}): {exc.message}",
+            "API Error %s (%s): %s", exc.status_code, exc.error_code, exc.message,
             exc_info=True
         )
     else:
         logger.warning(
-            f"API Error {exc.status_code} ({exc.error_code}): {exc.message}"
+            "API Error %s (%s): %s", exc.status_code, exc.error_code, exc.message
         )
     
     # Devolver respuesta JSON
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content=exc.to_dict()
     )
 
-async def validation_exception_handler(request: Request, exc: RequestValidationError) -> JSONResponse:
+async def validation_exception_handler(request: Request, exc: RequestValidationError) -> ORJSONResponse:
     """
     Manejador de errores de validación de FastAPI.
     
@@ -290,8 +307,10 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     # Extraer errores de validación
     field_errors = {}
     for error in exc.errors():
-        loc = ".".join([str(l) for l in error["loc"] if l != "body"])
-        field_errors[loc] = error["msg"]
+        # "body" solo aparece como primer elemento de la ruta
+        loc = error["loc"]
+        start = 1 if loc and loc[0] == "body" else 0
+        field_errors[".".join(map(str, loc[start:]))] = error["msg"]
     
     # Crear excepción personalizada
     custom_exc = ValidationError(
@@ -301,17 +320,17 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     
     # Registrar error
     logger.warning(
-        f"Validation Error: {custom_exc.message}",
+        "Validation Error: %s", custom_exc.message,
         extra={"field_errors": field_errors}
     )
     
     # Devolver respuesta JSON
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=custom_exc.status_code,
         content=custom_exc.to_dict()
     )
 
-async def generic_exception_handler(request: Request, exc: Exception) -> JSONResponse:
+async def generic_exception_handler(request: Request, exc: Exception) -> ORJSONResponse:
     """
     Manejador genérico para excepciones no controladas.
     
@@ -322,37 +341,37 @@ async def generic_exception_handler(request: Request, exc: Exception) -> JSONRes
     Returns:
         Respuesta JSON con información del error
     """
-    # Obtener información del error
-    error_detail = "".join(traceback.format_exception(
-        type(exc), exc, exc.__traceback__
-    ))
-    
     # Ocultar detalles en producción
     is_production = os.getenv("ENVIRONMENT", "development") == "production"
     
+    # Añadir detalles solo en desarrollo (en producción no se formatea la traza;
+    # logger.error(..., exc_info=True) ya la registra)
+    details = None
+    if not is_production:
+        details = {
+            "exception_type": exc.__class__.__name__,
+            "exception_message": str(exc),
+            "traceback": "".join(traceback.format_exception(
+                type(exc), exc, exc.__traceback__
+            )).splitlines()
+        }
+    
     # Crear excepción personalizada
     custom_exc = APIException(
         status_code=500,
         error_code="internal_server_error",
-        message="Error interno del servidor"
+        message="Error interno del servidor",
+        details=details
     )
     
-    # Añadir detalles solo en desarrollo
-    if not is_production:
-        custom_exc.details = {
-            "exception_type": exc.__class__.__name__,
-            "exception_message": str(exc),
-            "traceback": error_detail.split("\n")
-        }
-    
     # Registrar error
     logger.error(
-        f"Unhandled Exception: {exc.__class__.__name__}: {str(exc)}",
+        "Unhandled Exception: %s: %s", exc.__class__.__name__, exc,
         exc_info=True
     )
     
     # Devolver respuesta JSON
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=custom_exc.status_code,
         content=custom_exc.to_dict()
     )
@@ -1,23 +1,182 @@
 import os
+import re
+import copy
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from math import radians, sin, cos, sqrt, atan2
+import numpy as np
 import requests
-from typing import Dict, Any, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Optional, Tuple, List
+from geopy.adapters import RequestsAdapter
+from geopy.extra.rate_limiter import RateLimiter
 from geopy.geocoders import Nominatim
-import folium
 from dotenv import load_dotenv
 
 load_dotenv()
 
+if "/app" in os.environ.get("PYTHONPATH", ""):
+    from utils.enhanced_cache import cache_manager
+else:
+    try:
+        from src.utils.enhanced_cache import cache_manager
+    except ImportError:
+        from utils.enhanced_cache import cache_manager
+
+# Reverse geocoding results keyed by coordinates rounded to 5 decimals (~1 m);
+# shared by every GeoService instance in the process
+_reverse_geocode_cache = cache_manager.get_or_create_cache("reverse_geocode", max_size=4096, ttl_seconds=86400)
+
+# Second, on-disk tier for reverse geocoding so short-lived workers keep their
+# results across restarts (SQLite file under GEO_CACHE_DIR)
+_GEO_CACHE_PATH = os.path.join(os.getenv("GEO_CACHE_DIR", "/tmp/geo_cache"), "reverse_geocode.sqlite3")
+_GEO_DISK_TTL_SECONDS = float(os.getenv("GEO_DISK_CACHE_TTL_SECONDS", str(30 * 86400)))
+_disk_lock = threading.Lock()
+_disk_conn = None
+
+# Rendered map HTML keyed by map type, coordinates rounded to 5 decimals and zoom
+_map_html_cache = cache_manager.get_or_create_cache("map_html", max_size=64, ttl_seconds=1800)
+
+# Pooled HTTP session for Google Maps and direct Nominatim calls (keeps TCP/TLS connections alive)
+_http = requests.Session()
+_http.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=16))
+
+# Worker threads for network lookups that can overlap (e.g. Google Maps alongside Nominatim)
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="geo-service")
+
+_GOOGLE_GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+_NOMINATIM_REVERSE_URL = "https://nominatim.openstreetmap.org/reverse"
+_NOMINATIM_HEADERS = {"User-Agent": "drone-osint-geospy"}
+
+# Earth radius in meters
+_EARTH_RADIUS_M = 6371000
+
+# Mapbox raster tile URL per style (the token is filled in once per GeoService)
+_MAPBOX_TILE_URL = "https://api.mapbox.com/styles/v1/mapbox/{style}/tiles/256/{{z}}/{{x}}/{{y}}@2x?access_token={token}"
+
+# Extra Mapbox layers offered in the interactive map's layer control: (style, attribution, name)
+_MAPBOX_LAYERS = (
+    ("streets-v12", "Mapbox Streets", "Streets"),
+    ("satellite-v9", "Mapbox Satellite", "Satellite"),
+    ("outdoors-v12", "Mapbox Outdoors", "Outdoors"),
+)
+
+# Shared styling for the location marker and accuracy circle
+_MARKER_ICON_KWARGS = {"color": "red", "icon": "info-sign"}
+_CIRCLE_KWARGS = {"color": "crimson", "fill": True, "fill_color": "crimson", "fill_opacity": 0.2}
+
+# Collapses indentation and blank lines in rendered map HTML while keeping
+# line breaks, so inline scripts stay valid
+_HTML_WHITESPACE_RE = re.compile(r"\s*\n\s*")
+
+def _disk_connection() -> sqlite3.Connection:
+    """Open (once) the SQLite file backing the persistent reverse geocoding cache."""
+    global _disk_conn
+    if _disk_conn is None:
+        os.makedirs(os.path.dirname(_GEO_CACHE_PATH), exist_ok=True)
+        conn = sqlite3.connect(_GEO_CACHE_PATH, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS reverse_geocode "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        # Lets the expiry DELETE on each write find old rows without a full scan
+        conn.execute("CREATE INDEX IF NOT EXISTS reverse_geocode_created ON reverse_geocode (created)")
+        _disk_conn = conn
+    return _disk_conn
+
+def _disk_get(key: str) -> Optional[Dict[str, Any]]:
+    """Read a reverse geocoding result from disk; None when missing, expired or unreadable."""
+    try:
+        with _disk_lock:
+            conn = _disk_connection()
+            row = conn.execute(
+                "SELECT value, created FROM reverse_geocode WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time() - _GEO_DISK_TTL_SECONDS:
+                # Expired: delete it instead of leaving it in the file
+                conn.execute("DELETE FROM reverse_geocode WHERE key = ?", (key,))
+                return None
+        return json.loads(row[0])
+    except (sqlite3.Error, OSError, ValueError) as e:
+        print(f"Reverse geocoding disk cache unavailable: {str(e)}")
+        return None
+
+def _disk_set(key: str, value: Dict[str, Any]) -> None:
+    """Write through a reverse geocoding result to disk (best effort)."""
+    try:
+        now = time.time()
+        with _disk_lock:
+            conn = _disk_connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO reverse_geocode (key, value, created) VALUES (?, ?, ?)",
+                (key, json.dumps(value), now)
+            )
+            # Drop expired rows so the file does not grow forever
+            conn.execute(
+                "DELETE FROM reverse_geocode WHERE created < ?", (now - _GEO_DISK_TTL_SECONDS,)
+            )
+    except (sqlite3.Error, OSError, TypeError, ValueError) as e:
+        print(f"Reverse geocoding disk cache unavailable: {str(e)}")
+
 class GeoService:
     """
     Service for handling geolocation processing, verification, and mapping.
     """
     
-    def __init__(self):
-        """Initialize the geolocation service with necessary API keys and services."""
+    def __init__(self, use_fast_path: bool = True):
+        """
+        Initialize the geolocation service with necessary API keys and services.
+        
+        Args:
+            use_fast_path: Query Nominatim directly over the pooled session instead of going through geopy
+        """
         self.google_maps_api_key = os.getenv("GOOGLE_MAPS_API_KEY", "")
         self.mapbox_token = os.getenv("MAPBOX_API_KEY", "")
-        # Initialize Nominatim for reverse geocoding (no API key needed)
-        self.geolocator = Nominatim(user_agent="drone-osint-geospy")
+        # Tile URLs with the token already substituted, keyed by Mapbox style
+        self._mapbox_tiles = {
+            style: _MAPBOX_TILE_URL.format(style=style, token=self.mapbox_token)
+            for style in ("satellite-streets-v12",) + tuple(layer[0] for layer in _MAPBOX_LAYERS)
+        }
+        # Initialize Nominatim for reverse geocoding (no API key needed); the requests
+        # adapter keeps a pooled session so connections are reused across lookups
+        self.geolocator = Nominatim(user_agent="drone-osint-geospy", adapter_factory=RequestsAdapter)
+        # Nominatim's usage policy allows 1 request/s; the limiter is thread-safe so
+        # concurrent batch lookups are spaced out too (lower it for a self-hosted instance)
+        self.use_fast_path = use_fast_path
+        self._reverse = RateLimiter(
+            self._reverse_fast if use_fast_path else self._reverse_geopy,
+            min_delay_seconds=float(os.getenv("NOMINATIM_MIN_DELAY_SECONDS", "1.0")),
+            max_retries=0,
+            swallow_exceptions=False
+        )
+    
+    def _reverse_fast(self, latitude: float, longitude: float) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Reverse geocode with a single GET against Nominatim; returns (address, display_name) or None."""
+        response = _http.get(
+            _NOMINATIM_REVERSE_URL,
+            params={"format": "jsonv2", "lat": latitude, "lon": longitude, "accept-language": "en"},
+            headers=_NOMINATIM_HEADERS,
+            timeout=5
+        )
+        response.raise_for_status()
+        data = response.json()
+        if not data or "error" in data:
+            return None
+        return data.get("address", {}), data.get("display_name", "")
+    
+    def _reverse_geopy(self, latitude: float, longitude: float) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Reverse geocode through geopy's Nominatim client; returns (address, display_name) or None."""
+        location = self.geolocator.reverse((latitude, longitude), language="en")
+        if not location:
+            return None
+        return location.raw.get('address', {}), location.address
     
     def get_location_from_coordinates(self, latitude: float, longitude: float) -> Dict[str, Any]:
         """
@@ -31,13 +190,25 @@ class GeoService:
             Dictionary with detailed location information
         """
         try:
+            # Lookup order: memory -> disk -> network (writing through on misses)
+            cache_key = f"{round(latitude, 5)}:{round(longitude, 5)}:en"
+            cached = _reverse_geocode_cache.get(cache_key)
+            if cached is None:
+                cached = _disk_get(cache_key)
+                if cached is not None:
+                    _reverse_geocode_cache.set(cache_key, cached)
+            if cached is not None:
+                location_data = copy.deepcopy(cached)
+                location_data["coordinates"] = {"latitude": latitude, "longitude": longitude}
+                return location_data
+            
             # Use Nominatim for reverse geocoding
-            location = self.geolocator.reverse((latitude, longitude), language="en")
+            location = self._reverse(latitude, longitude)
             
             if not location:
                 return {"error": "Location not found"}
                 
-            address_data = location.raw.get('address', {})
+            address_data, display_name = location
             
             # Structure the response
             location_data = {
@@ -56,15 +227,58 @@ class GeoService:
                     "street": address_data.get("road", address_data.get("street", "Unknown")),
                     "postal_code": address_data.get("postcode", "Unknown"),
                 },
-                "display_name": location.address,
+                "display_name": display_name,
                 "raw_data": address_data
             }
             
+            _reverse_geocode_cache.set(cache_key, copy.deepcopy(location_data))
+            _disk_set(cache_key, location_data)
             return location_data
             
         except Exception as e:
             return {"error": f"Error getting location data: {str(e)}"}
     
+    async def get_locations_from_coordinates_batch(
+        self,
+        points: List[Tuple[float, float]],
+        max_concurrency: int = 5
+    ) -> List[Dict[str, Any]]:
+        """
+        Reverse geocode several points concurrently.
+        
+        Args:
+            points: (latitude, longitude) pairs
+            max_concurrency: Maximum number of lookups in flight
+            
+        Returns:
+            Location dictionaries in the same order as points
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def lookup(latitude: float, longitude: float) -> Dict[str, Any]:
+            async with semaphore:
+                return await asyncio.to_thread(self.get_location_from_coordinates, latitude, longitude)
+        
+        # Points that round to the same cache key are only looked up once
+        unique = {}
+        for latitude, longitude in points:
+            unique.setdefault((round(latitude, 5), round(longitude, 5)), (latitude, longitude))
+        
+        results = await asyncio.gather(*(lookup(lat, lon) for lat, lon in unique.values()))
+        by_key = dict(zip(unique.keys(), results))
+        
+        locations = []
+        for latitude, longitude in points:
+            location_data = copy.deepcopy(by_key[(round(latitude, 5), round(longitude, 5))])
+            if "coordinates" in location_data:
+                location_data["coordinates"] = {"latitude": latitude, "longitude": longitude}
+            locations.append(location_data)
+        return locations
+    
+    def get_locations_from_coordinates(self, points: List[Tuple[float, float]], max_concurrency: int = 5) -> List[Dict[str, Any]]:
+        """Synchronous wrapper around get_locations_from_coordinates_batch for non-async callers."""
+        return asyncio.run(self.get_locations_from_coordinates_batch(points, max_concurrency))
+    
     def enhance_with_google_maps(self, latitude: float, longitude: float) -> Dict[str, Any]:
         """
         Enhance location data with Google Maps API (if API key is provided).
@@ -81,8 +295,11 @@ class GeoService:
             
         try:
             # Google Maps Geocoding API endpoint
-            url = f"https://maps.googleapis.com/maps/api/geocode/json?latlng={latitude},{longitude}&key={self.google_maps_api_key}"
-            response = requests.get(url)
+            response = _http.get(
+                _GOOGLE_GEOCODE_URL,
+                params={"latlng": f"{latitude},{longitude}", "key": self.google_maps_api_key},
+                timeout=5
+            )
             data = response.json()
             
             if data.get("status") != "OK":
@@ -136,7 +353,15 @@ class GeoService:
         Returns:
             HTML string containing the map
         """
+        cache_key = f"folium,{latitude:.5f},{longitude:.5f},{zoom}"
+        html = _map_html_cache.get(cache_key)
+        if html is not None:
+            return html
+        
         try:
+            # Imported on first use: folium is only needed when a map is actually rendered
+            import folium
+            
             # Create a map centered at the specified location
             map_obj = folium.Map(
                 location=[latitude, longitude],
@@ -150,7 +375,7 @@ class GeoService:
             folium.Marker(
                 [latitude, longitude],
                 popup=f"Lat: {latitude:.6f}, Long: {longitude:.6f}",
-                icon=folium.Icon(color="red", icon="info-sign")
+                icon=folium.Icon(**_MARKER_ICON_KWARGS)
             ).add_to(map_obj)
             
             # Add a circle to represent approximate accuracy
@@ -158,18 +383,16 @@ class GeoService:
                 radius=50,
                 location=[latitude, longitude],
                 popup='Approximate Area',
-                color="crimson",
-                fill=True,
-                fill_color="crimson",
-                fill_opacity=0.2
+                **_CIRCLE_KWARGS
             ).add_to(map_obj)
             
             # Get the HTML representation
             html = map_obj._repr_html_()
             
             # Clean up the HTML
-            html = html.replace('\n', '').replace('  ', '')
+            html = _HTML_WHITESPACE_RE.sub("\n", html)
             
+            _map_html_cache.set(cache_key, html)
             return html
             
         except Exception as e:
@@ -194,11 +417,18 @@ class GeoService:
                 # Fall back to basic map if no token is available
                 return self.generate_map(latitude, longitude, zoom)
             
+            cache_key = f"folium-mapbox,{latitude:.5f},{longitude:.5f},{zoom}"
+            cached_html = _map_html_cache.get(cache_key)
+            if cached_html is not None:
+                return cached_html
+            
+            import folium
+            
             # Create a map centered at the specified coordinates with Mapbox tiles
             m = folium.Map(
                 location=[latitude, longitude], 
                 zoom_start=zoom, 
-                tiles='https://api.mapbox.com/styles/v1/mapbox/satellite-streets-v12/tiles/256/{z}/{x}/{y}@2x?access_token=' + self.mapbox_token,
+                tiles=self._mapbox_tiles["satellite-streets-v12"],
                 attr='Mapbox'
             )
             
@@ -207,43 +437,26 @@ class GeoService:
             folium.Marker(
                 [latitude, longitude], 
                 tooltip=tooltip,
-                icon=folium.Icon(color='red', icon='info-sign')
+                icon=folium.Icon(**_MARKER_ICON_KWARGS)
             ).add_to(m)
             
             # Add a circle to indicate a radius
             folium.Circle(
                 radius=500,  # 500 meters
                 location=[latitude, longitude],
-                color='crimson',
-                fill=True,
-                fill_color='crimson',
-                fill_opacity=0.2
+                **_CIRCLE_KWARGS
             ).add_to(m)
             
             # Add layer control with different map styles
-            folium.TileLayer(
-                tiles='https://api.mapbox.com/styles/v1/mapbox/streets-v12/tiles/256/{z}/{x}/{y}@2x?access_token=' + self.mapbox_token,
-                attr='Mapbox Streets',
-                name='Streets'
-            ).add_to(m)
-            
-            folium.TileLayer(
-                tiles='https://api.mapbox.com/styles/v1/mapbox/satellite-v9/tiles/256/{z}/{x}/{y}@2x?access_token=' + self.mapbox_token,
-                attr='Mapbox Satellite',
-                name='Satellite'
-            ).add_to(m)
-            
-            folium.TileLayer(
-                tiles='https://api.mapbox.com/styles/v1/mapbox/outdoors-v12/tiles/256/{z}/{x}/{y}@2x?access_token=' + self.mapbox_token,
-                attr='Mapbox Outdoors',
-                name='Outdoors'
-            ).add_to(m)
+            for style, attr, name in _MAPBOX_LAYERS:
+                folium.TileLayer(tiles=self._mapbox_tiles[style], attr=attr, name=name).add_to(m)
             
             folium.LayerControl().add_to(m)
             
             # Get the HTML representation
-            html_map = m._repr_html_()
+            html_map = _HTML_WHITESPACE_RE.sub("\n", m._repr_html_())
             
+            _map_html_cache.set(cache_key, html_map)
             return html_map
             
         except Exception as e:
@@ -260,13 +473,21 @@ class GeoService:
                         <p>Coordenadas: {latitude}, {longitude}</p>
                         </div>"""
     
-    def merge_location_data(self, llm_data: Dict[str, Any], metadata_gps: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    def merge_location_data(
+        self,
+        llm_data: Dict[str, Any],
+        metadata_gps: Optional[Dict[str, Any]],
+        skip_reverse: bool = False,
+        include_google_maps: bool = False
+    ) -> Dict[str, Any]:
         """
         Merge and validate location data from multiple sources (Vision LLM and image metadata).
         
         Args:
             llm_data: Location data extracted by the vision LLM
             metadata_gps: GPS coordinates from image metadata
+            skip_reverse: Never fall back to reverse geocoding (no network call)
+            include_google_maps: Also enrich with Google Maps, concurrently with reverse geocoding
             
         Returns:
             Merged and validated location data
@@ -323,8 +544,15 @@ class GeoService:
                     )
                 }
         
+        # Google Maps enrichment runs on the pool while reverse geocoding (if any) runs here
+        google_future = None
+        if include_google_maps and self.google_maps_api_key and "coordinates" in result["merged_data"]:
+            coords = result["merged_data"]["coordinates"]
+            google_future = _executor.submit(self.enhance_with_google_maps, coords["latitude"], coords["longitude"])
+        
         # If we have coordinates, enhance with reverse geocoding if address is not available
-        if "coordinates" in result["merged_data"] and "address" not in result["merged_data"]:
+        # (an address from the LLM, whichever coordinates won, makes the network trip unnecessary)
+        if not skip_reverse and "coordinates" in result["merged_data"] and "address" not in result["merged_data"]:
             try:
                 coords = result["merged_data"]["coordinates"]
                 location_data = self.get_location_from_coordinates(coords["latitude"], coords["longitude"])
@@ -336,6 +564,13 @@ class GeoService:
             except Exception as e:
                 result["errors"] = [f"Error in reverse geocoding: {str(e)}"]
         
+        if google_future is not None:
+            google_data = google_future.result()
+            if "error" in google_data:
+                result.setdefault("errors", []).append(google_data["error"])
+            else:
+                result["sources"]["google_maps"] = google_data["google_maps"]
+        
         return result
     
     @staticmethod
@@ -352,10 +587,7 @@ class GeoService:
         Returns:
             Distance in meters
         """
-        from math import radians, sin, cos, sqrt, atan2
-        
-        # Earth radius in meters
-        R = 6371000
+        R = _EARTH_RADIUS_M
         
         # Convert coordinates to radians
         lat1_rad = radians(lat1)
@@ -372,4 +604,26 @@ class GeoService:
         c = 2 * atan2(sqrt(a), sqrt(1-a))
         distance = R * c
         
-        return distance 
\ No newline at end of file
+        return distance 
+    
+    @staticmethod
+    def _calculate_distance_batch(lat1, lon1, lat2, lon2) -> np.ndarray:
+        """
+        Vectorized Haversine distance in meters for arrays of points.
+        
+        Args:
+            lat1: Latitudes of the first points in decimal degrees (array-like or scalar)
+            lon1: Longitudes of the first points in decimal degrees
+            lat2: Latitudes of the second points in decimal degrees
+            lon2: Longitudes of the second points in decimal degrees
+            
+        Returns:
+            Array of distances in meters (inputs are broadcast together)
+        """
+        lat1_rad = np.radians(np.asarray(lat1, dtype=np.float64))
+        lat2_rad = np.radians(np.asarray(lat2, dtype=np.float64))
+        dlat = lat2_rad - lat1_rad
+        dlon = np.radians(np.asarray(lon2, dtype=np.float64) - np.asarray(lon1, dtype=np.float64))
+        
+        a = np.sin(dlat / 2) ** 2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlon / 2) ** 2
+        return _EARTH_RADIUS_M * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
@@ -4,10 +4,7 @@ Proporciona funciones para escalar, comprimir y preprocesar imágenes de forma e
 """
 
 import os
-import cv2
 import numpy as np
-from PIL import Image
-import io
 from typing import Tuple, Dict, Any, Optional, Union
 import logging
 import time
@@ -37,6 +34,8 @@ class ImageOptimizer:
         self.max_dimension = max_dimension
         self.quality = quality
         self.auto_enhance = auto_enhance
+        # Objeto CLAHE reutilizable (se crea al primer uso, cv2 se importa de forma diferida)
+        self._clahe = None
         logger.info(f"ImageOptimizer inicializado: max_dimension={max_dimension}, quality={quality}")
     
     def process_image(self, 
@@ -57,15 +56,18 @@ class ImageOptimizer:
         start_time = time.time()
         
         try:
-            # Verificar archivo
-            if not os.path.exists(image_path):
-                raise FileNotFoundError(f"No se encuentra la imagen: {image_path}")
+            # OpenCV se importa al primer uso para no penalizar el arranque
+            import cv2
+            
+            # Leer el archivo una sola vez (open lanza FileNotFoundError si no existe)
+            with open(image_path, "rb") as f:
+                buffer = f.read()
             
             # Obtener tamaño original del archivo
-            original_size = os.path.getsize(image_path) / (1024 * 1024)  # MB
+            original_size = len(buffer) / (1024 * 1024)  # MB
             
-            # Cargar imagen con OpenCV
-            img = cv2.imread(image_path)
+            # Decodificar imagen con OpenCV desde memoria
+            img = cv2.imdecode(np.frombuffer(buffer, np.uint8), cv2.IMREAD_COLOR)
             if img is None:
                 raise ValueError(f"No se pudo cargar la imagen: {image_path}")
             
@@ -93,11 +95,21 @@ class ImageOptimizer:
             if scaling_factor < 1.0:
                 new_width = int(original_width * scaling_factor)
                 new_height = int(original_height * scaling_factor)
-                img = cv2.resize(
-                    img, 
-                    (new_width, new_height), 
-                    interpolation=cv2.INTER_AREA
-                )
+                
+                # Reducciones grandes: pirámide de pyrDown (cada paso lee 1/4 de los píxeles
+                # del anterior) mientras otra mitad no quede por debajo del objetivo
+                remaining = scaling_factor
+                while remaining <= 0.5:
+                    img = cv2.pyrDown(img)
+                    remaining *= 2
+                
+                # Ajuste final al tamaño exacto
+                if img.shape[1] != new_width or img.shape[0] != new_height:
+                    img = cv2.resize(
+                        img, 
+                        (new_width, new_height), 
+                        interpolation=cv2.INTER_AREA
+                    )
                 logger.info(f"Imagen redimensionada: {original_width}x{original_height} -> {new_width}x{new_height}")
             else:
                 new_width, new_height = original_width, original_height
@@ -107,16 +119,22 @@ class ImageOptimizer:
                 img = self._enhance_image(img)
             
             # Guardar imagen optimizada si se proporciona ruta
+            encoded = None
             if output_path:
                 # Asegurar directorio de salida
                 os.makedirs(os.path.dirname(output_path), exist_ok=True)
                 
-                # Guardar con la calidad especificada
+                # Codificar en memoria con la calidad especificada (formato según extensión)
+                extension = os.path.splitext(output_path)[1] or ".jpg"
                 encode_params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
-                cv2.imwrite(output_path, img, encode_params)
+                ok, encoded = cv2.imencode(extension, img, encode_params)
+                if not ok:
+                    raise ValueError(f"No se pudo codificar la imagen: {output_path}")
+                with open(output_path, "wb") as f:
+                    f.write(encoded)
                 
-                # Verificar tamaño del archivo resultante
-                new_size = os.path.getsize(output_path) / (1024 * 1024)  # MB
+                # Tamaño del archivo resultante a partir del buffer, sin volver a consultar el disco
+                new_size = len(encoded) / (1024 * 1024)  # MB
                 size_reduction = (1 - new_size / original_size) * 100 if original_size > 0 else 0
                 
                 logger.info(f"Imagen optimizada guardada: {output_path}")
@@ -135,7 +153,8 @@ class ImageOptimizer:
                 "original_size_mb": original_size,
                 "scaling_factor": scaling_factor,
                 "process_time_seconds": process_time,
-                "enhanced": self.auto_enhance
+                "enhanced": self.auto_enhance,
+                "encoded_image": encoded.tobytes() if encoded is not None else None
             }
             
         except Exception as e:
@@ -157,50 +176,38 @@ class ImageOptimizer:
             Imagen mejorada
         """
         try:
-            # Convertir a escala de grises para análisis
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            import cv2
             
-            # Calcular histograma
-            hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
+            # Determinar si la imagen es oscura o tiene bajo contraste: media y desviación
+            # en una sola pasada sobre 1 de cada 4x4 píxeles del canal verde, que sirve
+            # como aproximación de la luminancia sin convertir toda la imagen a grises
+            mean, std = cv2.meanStdDev(img[::4, ::4, 1])
+            is_dark = mean[0, 0] < 100
+            low_contrast = std[0, 0] < 30
             
-            # Determinar si la imagen es oscura o tiene bajo contraste
-            is_dark = np.mean(gray) < 100
-            low_contrast = np.std(gray) < 30
+            if not (is_dark or low_contrast):
+                return img
             
-            # Imagen original para comparación
-            enhanced = img.copy()
+            # Brillo y contraste se aplican sobre el canal L en una única conversión
+            # BGR -> LAB -> BGR en lugar de pasar por HSV y LAB por separado
+            lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
+            l, a, b = cv2.split(lab)
             
-            # Aplicar mejoras según características
             if is_dark:
-                # Aumentar brillo
-                hsv = cv2.cvtColor(enhanced, cv2.COLOR_BGR2HSV)
-                h, s, v = cv2.split(hsv)
-                
-                # Incrementar valor (brillo)
-                limit = 255 - 30
-                v[v < limit] = v[v < limit] + 30
-                
-                hsv = cv2.merge((h, s, v))
-                enhanced = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
-                
+                # Aumentar luminosidad con suma saturada a 255
+                l = cv2.add(l, 30)
                 logger.debug("Aplicada mejora de brillo a imagen oscura")
             
             if low_contrast:
-                # Aplicar ecualización de histograma adaptativa
-                lab = cv2.cvtColor(enhanced, cv2.COLOR_BGR2LAB)
-                l, a, b = cv2.split(lab)
-                
                 # CLAHE (Contrast Limited Adaptive Histogram Equalization)
-                clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-                cl = clahe.apply(l)
-                
-                # Combinar canales nuevamente
-                lab = cv2.merge((cl, a, b))
-                enhanced = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
-                
+                if self._clahe is None:
+                    self._clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+                l = self._clahe.apply(l)
                 logger.debug("Aplicada ecualización de contraste adaptativa")
             
-            return enhanced
+            # Combinar canales nuevamente
+            lab = cv2.merge((l, a, b))
+            return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
             
         except Exception as e:
             logger.warning(f"Error en _enhance_image: {str(e)}")
@@ -1,26 +1,204 @@
 import os
+import re
+import copy
+import time
+import mmap
+import hashlib
+import tempfile
+import asyncio
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import Dict, Any, Optional, List, Tuple
+from urllib.parse import urlencode
 from dotenv import load_dotenv
 import base64
 from PIL import Image
 import io
 import folium
 from folium import plugins
+from jinja2 import Template
 
 # Load environment variables
 load_dotenv()
 
+# Read once at import; every MapboxService shares the same token and its derived query string
+_API_KEY = os.getenv("MAPBOX_API_KEY", "")
+_TOKEN_QS = urlencode({"access_token": _API_KEY})
+
+if "/app" in os.environ.get("PYTHONPATH", ""):
+    from utils.enhanced_cache import cache_manager
+else:
+    try:
+        from src.utils.enhanced_cache import cache_manager
+    except ImportError:
+        from utils.enhanced_cache import cache_manager
+
+# Static map / satellite image bytes and geocoding results, keyed by request kind and
+# parameters with coordinates rounded to 5 decimals (~1 m); shared by every instance
+_tile_cache = cache_manager.get_or_create_cache("mapbox_tiles", max_size=512, ttl_seconds=3600)
+_geocode_cache = cache_manager.get_or_create_cache("mapbox_geocode", max_size=2048, ttl_seconds=86400)
+
+# Rendered map HTML keyed by map type, coordinates rounded to 5 decimals and zoom
+# (same cache GeoService renders into)
+_map_html_cache = cache_manager.get_or_create_cache("map_html", max_size=64, ttl_seconds=1800)
+
+# On-disk tier for image bytes so warm restarts don't re-download the same maps.
+# Files are named by a hash of the URL without the access token (survives token rotation)
+_TILE_DISK_DIR = os.getenv("MAPBOX_TILE_CACHE_DIR", "/tmp/mapbox_tiles")
+_TILE_DISK_TTL_SECONDS = 7 * 86400
+# Oldest files are pruned after each write until the directory fits this budget
+_TILE_DISK_MAX_BYTES = int(os.getenv("MAPBOX_TILE_CACHE_MAX_BYTES", str(2 ** 30)))
+# Only one thread prunes at a time; other writers skip pruning while it runs
+_tile_prune_lock = threading.Lock()
+_ACCESS_TOKEN_RE = re.compile(r"access_token=[^&]*")
+
+# Collapses indentation and blank lines in rendered map HTML while keeping
+# line breaks, so inline scripts stay valid
+_HTML_WHITESPACE_RE = re.compile(r"\s*\n\s*")
+
+# (connect, read) timeouts for Mapbox requests
+_REQUEST_TIMEOUT = (3.05, 27)
+
+# Image downloads are streamed in chunks and refused beyond this size
+_STREAM_CHUNK_SIZE = 64 * 1024
+_MAX_IMAGE_BYTES = 16 * 1024 * 1024
+
+# Upper bound on how long a comparison waits for any single map image
+_COMPARISON_FETCH_TIMEOUT = 30
+
+# Drone image next to satellite, street and terrain maps; a map that could not be
+# fetched is replaced by a placeholder of the same size
+_COMPARISON_TMPL = Template("""
+{%- macro panel(title, src, missing) -%}
+<div style="width: {{ width }}px;">
+    <h3 style="text-align: center;">{{ title }}</h3>
+    {%- if src %}
+    <img src="{{ src }}" style="width: 100%; border: 2px solid #333; border-radius: 5px;" />
+    {%- else %}
+    <div style="width: 100%; height: {{ height }}px; display: flex; align-items: center; justify-content: center; background-color: #f0f0f0; border: 2px solid #333; border-radius: 5px;"><p>{{ missing }}</p></div>
+    {%- endif %}
+    {{- caller() if caller else "" }}
+</div>
+{%- endmacro %}
+<div style="display: flex; flex-direction: column; font-family: Arial, sans-serif;">
+    <div style="display: flex; justify-content: space-between; margin-bottom: 20px;">
+        {% call panel("Drone Image", drone_src, "Drone image not available") %}
+        <p style="text-align: center;">COORDINATES: {{ "%.6f"|format(latitude) }}, {{ "%.6f"|format(longitude) }}</p>
+        {%- endcall %}
+        {{ panel("Satellite View", satellite_src, "Satellite image not available") }}
+    </div>
+    <div style="display: flex; justify-content: space-between;">
+        {{ panel("Street Map", street_src, "Street map not available") }}
+        {{ panel("Terrain Map", terrain_src, "Terrain map not available") }}
+    </div>
+</div>
+""")
+
+class _TokenBucket:
+    """
+    Thread-safe token bucket: allows bursts up to `capacity` requests, refilled
+    at `rate_per_minute`. acquire() blocks until a token is available.
+    """
+    
+    def __init__(self, rate_per_minute: float, capacity: Optional[int] = None):
+        self._rate = rate_per_minute / 60.0
+        self._capacity = float(capacity if capacity is not None else max(1, int(rate_per_minute // 60)))
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self._rate
+            time.sleep(wait)
+
+def _prune_tile_disk_cache() -> None:
+    """Delete the least recently written cached images until the directory is under _TILE_DISK_MAX_BYTES."""
+    if not _tile_prune_lock.acquire(blocking=False):
+        return
+    try:
+        files, total = [], 0
+        with os.scandir(_TILE_DISK_DIR) as entries:
+            for entry in entries:
+                if entry.name.endswith(".bin") and entry.is_file():
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        
+        if total <= _TILE_DISK_MAX_BYTES:
+            return
+        files.sort()
+        for _, size, path in files:
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass  # Already removed by another process
+            if total <= _TILE_DISK_MAX_BYTES:
+                break
+    except OSError as e:
+        print(f"Could not prune Mapbox disk cache: {str(e)}")
+    finally:
+        _tile_prune_lock.release()
+
+# Per-process request budgets shared by every MapboxService instance (Mapbox's
+# default quotas are 600 geocoding and 1250 static image requests per minute)
+_geocode_bucket = _TokenBucket(float(os.getenv("MAPBOX_GEOCODE_RATE_PER_MINUTE", "600")))
+_image_bucket = _TokenBucket(float(os.getenv("MAPBOX_STATIC_RATE_PER_MINUTE", "1250")))
+
+# Mapbox geocoding context id prefix -> address component name
+_CONTEXT_COMPONENTS = {
+    "country": "country",
+    "region": "region",
+    "district": "district",
+    "place": "city",
+    "postcode": "postcode",
+    "neighborhood": "neighborhood",
+}
+
+# Drone images at least this large are memory-mapped rather than read into a bytes copy
+_MMAP_MIN_BYTES = 1024 * 1024
+
 class MapboxService:
     """
     Service for integrating with Mapbox APIs to get satellite imagery and static maps.
     """
     
+    # Static Images API path; the token query string is appended separately
+    _STATIC_TMPL = "https://api.mapbox.com/styles/v1/mapbox/{style}/static/{overlay}{lon},{lat},{zoom}/{w}x{h}"
+    
     def __init__(self):
         """Initialize the Mapbox service with necessary API keys."""
-        self.mapbox_api_key = os.getenv("MAPBOX_API_KEY", "")
+        self.mapbox_api_key = _API_KEY
         if not self.mapbox_api_key:
             print("WARNING: MAPBOX_API_KEY not found in environment variables")
+        self._token_qs = _TOKEN_QS
+        # The token is embedded in rendered tile URLs, so cached HTML is tagged with it
+        self._token_tag = hashlib.blake2b(self.mapbox_api_key.encode(), digest_size=4).hexdigest()
+        # Keep-alive session: one TCP/TLS connection pool to api.mapbox.com for all calls,
+        # retrying throttled and transient server errors with backoff
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+        ))
+        # Shared pool for fetching the comparison images concurrently
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="mapbox")
+        # Background folium renders started by prewarm_interactive_map, keyed like the HTML cache
+        self._prerender_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mapbox-render")
+        self._pending_maps: Dict[str, Future] = {}
+        self._pending_lock = threading.Lock()
     
     def geocode_forward(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         """
@@ -37,11 +215,16 @@ class MapboxService:
             # Ensure limit is between 1 and 10
             limit = max(1, min(10, limit))
             
+            cache_key = f"forward,{query},{limit}"
+            cached = _geocode_cache.get(cache_key)
+            if cached is not None:
+                return copy.deepcopy(cached)
+            
             # Build the Mapbox Geocoding API URL
-            url = f"https://api.mapbox.com/geocoding/v5/mapbox.places/{query}.json?access_token={self.mapbox_api_key}&limit={limit}"
+            url = f"https://api.mapbox.com/geocoding/v5/mapbox.places/{query}.json?{self._token_qs}&limit={limit}"
             
             # Make the request
-            response = requests.get(url)
+            response = self._geocode_get(url, timeout=_REQUEST_TIMEOUT)
             response.raise_for_status()
             
             # Parse the response
@@ -62,12 +245,131 @@ class MapboxService:
                 }
                 results.append(result)
             
+            _geocode_cache.set(cache_key, copy.deepcopy(results))
             return results
             
         except Exception as e:
             print(f"Error in forward geocoding: {str(e)}")
             return []
     
+    def _geocode_get(self, url: str, **kwargs) -> requests.Response:
+        """GET a geocoding URL once the shared geocoding budget allows it."""
+        _geocode_bucket.acquire()
+        return self._session.get(url, **kwargs)
+    
+    def _cached_fetch(self, url: str) -> bytes:
+        """
+        Download image bytes from Mapbox, going through the on-disk cache first.
+        
+        Args:
+            url: Full request URL (including access token)
+            
+        Returns:
+            Response body
+        """
+        key = hashlib.blake2b(_ACCESS_TOKEN_RE.sub("", url).encode(), digest_size=16).hexdigest()
+        path = os.path.join(_TILE_DISK_DIR, f"{key}.bin")
+        
+        try:
+            if time.time() - os.path.getmtime(path) < _TILE_DISK_TTL_SECONDS:
+                with open(path, "rb") as f:
+                    return f.read()
+            # Expired: delete it rather than leave it on disk until the next write
+            os.remove(path)
+        except OSError:
+            pass  # Not cached (or unreadable): fall through to the network
+        
+        _image_bucket.acquire()
+        
+        # Stream into a bounded buffer; the connection goes back to the pool as soon as the body is read
+        buffer = io.BytesIO()
+        with self._session.get(url, timeout=_REQUEST_TIMEOUT, stream=True) as response:
+            response.raise_for_status()  # Raise exception for HTTP errors
+            for chunk in response.iter_content(chunk_size=_STREAM_CHUNK_SIZE):
+                buffer.write(chunk)
+                if buffer.tell() > _MAX_IMAGE_BYTES:
+                    raise ValueError(f"Mapbox image larger than {_MAX_IMAGE_BYTES} bytes")
+        content = buffer.getvalue()
+        buffer.close()
+        
+        try:
+            # Write to a temporary file and rename so readers never see a partial image
+            os.makedirs(_TILE_DISK_DIR, exist_ok=True)
+            # Unique per writer, so concurrent fetches of the same URL never share a temp file
+            fd, tmp_path = tempfile.mkstemp(dir=_TILE_DISK_DIR, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+            except OSError:
+                os.remove(tmp_path)
+                raise
+        except OSError as e:
+            print(f"Could not write Mapbox disk cache: {str(e)}")
+        else:
+            _prune_tile_disk_cache()
+        
+        return content
+    
+    async def geocode_forward_batch(
+        self,
+        queries: List[str],
+        limit: int = 5,
+        max_concurrency: int = 10
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Forward geocode several queries concurrently.
+        
+        Args:
+            queries: Addresses or place names to geocode
+            limit: Maximum number of results per query (1-10)
+            max_concurrency: Maximum number of requests in flight
+            
+        Returns:
+            One result list per query, in the same order as queries
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def lookup(query: str) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return await asyncio.to_thread(self.geocode_forward, query, limit)
+        
+        # Repeated queries are only sent once
+        unique = list(dict.fromkeys(queries))
+        results = dict(zip(unique, await asyncio.gather(*(lookup(query) for query in unique))))
+        return [list(results[query]) for query in queries]
+    
+    def geocode_forward_many(self, queries: List[str], limit: int = 5, max_concurrency: int = 10) -> List[List[Dict[str, Any]]]:
+        """Synchronous wrapper around geocode_forward_batch for non-async callers."""
+        return asyncio.run(self.geocode_forward_batch(queries, limit, max_concurrency))
+    
+    async def geocode_reverse_batch(
+        self,
+        points: List[Tuple[float, float]],
+        max_concurrency: int = 10
+    ) -> List[Dict[str, Any]]:
+        """
+        Reverse geocode several points concurrently.
+        
+        Args:
+            points: (longitude, latitude) pairs, in the same order geocode_reverse takes them
+            max_concurrency: Maximum number of requests in flight
+            
+        Returns:
+            Address dictionaries in the same order as points
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def lookup(longitude: float, latitude: float) -> Dict[str, Any]:
+            async with semaphore:
+                return await asyncio.to_thread(self.geocode_reverse, longitude, latitude)
+        
+        return await asyncio.gather(*(lookup(lon, lat) for lon, lat in points))
+    
+    def geocode_reverse_many(self, points: List[Tuple[float, float]], max_concurrency: int = 10) -> List[Dict[str, Any]]:
+        """Synchronous wrapper around geocode_reverse_batch for non-async callers."""
+        return asyncio.run(self.geocode_reverse_batch(points, max_concurrency))
+    
     def geocode_reverse(self, longitude: float, latitude: float) -> Dict[str, Any]:
         """
         Perform reverse geocoding (coordinates to address) using Mapbox Geocoding API.
@@ -80,11 +382,16 @@ class MapboxService:
             Dictionary with address data
         """
         try:
+            cache_key = f"reverse,{longitude:.5f},{latitude:.5f}"
+            cached = _geocode_cache.get(cache_key)
+            if cached is not None:
+                return copy.deepcopy(cached)
+            
             # Build the Mapbox Geocoding API URL
-            url = f"https://api.mapbox.com/geocoding/v5/mapbox.places/{longitude},{latitude}.json?access_token={self.mapbox_api_key}"
+            url = f"https://api.mapbox.com/geocoding/v5/mapbox.places/{longitude},{latitude}.json?{self._token_qs}"
             
             # Make the request
-            response = requests.get(url)
+            response = self._geocode_get(url, timeout=_REQUEST_TIMEOUT)
             response.raise_for_status()
             
             # Parse the response
@@ -98,19 +405,10 @@ class MapboxService:
                 # Extract address components
                 address_components = {}
                 for context in feature.get("context", []):
-                    context_id = context.get("id", "")
-                    if context_id.startswith("country"):
-                        address_components["country"] = context.get("text", "")
-                    elif context_id.startswith("region"):
-                        address_components["region"] = context.get("text", "")
-                    elif context_id.startswith("district"):
-                        address_components["district"] = context.get("text", "")
-                    elif context_id.startswith("place"):
-                        address_components["city"] = context.get("text", "")
-                    elif context_id.startswith("postcode"):
-                        address_components["postcode"] = context.get("text", "")
-                    elif context_id.startswith("neighborhood"):
-                        address_components["neighborhood"] = context.get("text", "")
+                    # Context ids look like "place.123"; the prefix names the component
+                    key = _CONTEXT_COMPONENTS.get(context.get("id", "").split(".", 1)[0])
+                    if key:
+                        address_components[key] = context.get("text", "")
                 
                 # Create the result
                 result = {
@@ -121,6 +419,7 @@ class MapboxService:
                     "address_type": feature.get("place_type", []),
                 }
                 
+                _geocode_cache.set(cache_key, copy.deepcopy(result))
                 return result
             
             return {"error": "No results found"}
@@ -145,14 +444,19 @@ class MapboxService:
             Image data as bytes or None if error
         """
         try:
+            cache_key = f"satellite,{latitude:.5f},{longitude:.5f},{zoom},{width}x{height}"
+            cached = _tile_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
             # Build the Mapbox Static API URL for satellite imagery
-            url = f"https://api.mapbox.com/styles/v1/mapbox/satellite-v9/static/{longitude},{latitude},{zoom}/{width}x{height}?access_token={self.mapbox_api_key}"
+            url = f"https://api.mapbox.com/styles/v1/mapbox/satellite-v9/static/{longitude},{latitude},{zoom}/{width}x{height}?{self._token_qs}"
             
-            # Make the request
-            response = requests.get(url)
-            response.raise_for_status()  # Raise exception for HTTP errors
+            # Make the request (or read it from the disk cache)
+            content = self._cached_fetch(url)
             
-            return response.content
+            _tile_cache.set(cache_key, content)
+            return content
             
         except Exception as e:
             print(f"Error getting satellite image: {str(e)}")
@@ -177,33 +481,22 @@ class MapboxService:
             Image data as bytes or None if error
         """
         try:
-            # Initialize URL parts
-            url_parts = [
-                f"https://api.mapbox.com/styles/v1/mapbox/{style}/static"
-            ]
-            
-            # Add marker if requested
-            if marker:
-                url_parts.append(f"pin-s+FF4B4B({longitude},{latitude})")
+            cache_key = f"static,{style},{marker},{latitude:.5f},{longitude:.5f},{zoom},{width}x{height}"
+            cached = _tile_cache.get(cache_key)
+            if cached is not None:
+                return cached
             
-            # Add center coordinates and zoom
-            url_parts.append(f"{longitude},{latitude},{zoom}")
+            # Optional marker overlay, then center/zoom and size
+            overlay = f"pin-s+FF4B4B({longitude},{latitude})/" if marker else ""
+            url = self._STATIC_TMPL.format(
+                style=style, overlay=overlay, lon=longitude, lat=latitude, zoom=zoom, w=width, h=height
+            ) + "?" + self._token_qs
             
-            # Add dimensions and access token
-            url_parts.append(f"{width}x{height}")
-            url_parts.append(f"?access_token={self.mapbox_api_key}")
+            # Make the request (or read it from the disk cache)
+            content = self._cached_fetch(url)
             
-            # Build the complete URL
-            if marker:
-                url = f"{url_parts[0]}/{url_parts[1]},{url_parts[2]}/{url_parts[3]}{url_parts[4]}"
-            else:
-                url = f"{url_parts[0]}/{url_parts[2]}/{url_parts[3]}{url_parts[4]}"
-            
-            # Make the request
-            response = requests.get(url)
-            response.raise_for_status()
-            
-            return response.content
+            _tile_cache.set(cache_key, content)
+            return content
             
         except Exception as e:
             print(f"Error getting static map: {str(e)}")
@@ -225,14 +518,19 @@ class MapboxService:
             Image data as bytes or None if error
         """
         try:
+            cache_key = f"street,{latitude:.5f},{longitude:.5f},{zoom},{width}x{height}"
+            cached = _tile_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
             # Build the Mapbox Static API URL for street map
-            url = f"https://api.mapbox.com/styles/v1/mapbox/streets-v11/static/pin-s+FF4B4B({longitude},{latitude})/{longitude},{latitude},{zoom}/{width}x{height}?access_token={self.mapbox_api_key}"
+            url = f"https://api.mapbox.com/styles/v1/mapbox/streets-v11/static/pin-s+FF4B4B({longitude},{latitude})/{longitude},{latitude},{zoom}/{width}x{height}?{self._token_qs}"
             
-            # Make the request
-            response = requests.get(url)
-            response.raise_for_status()
+            # Make the request (or read it from the disk cache)
+            content = self._cached_fetch(url)
             
-            return response.content
+            _tile_cache.set(cache_key, content)
+            return content
             
         except Exception as e:
             print(f"Error getting street map: {str(e)}")
@@ -254,21 +552,27 @@ class MapboxService:
             Image data as bytes or None if error
         """
         try:
+            cache_key = f"terrain,{latitude:.5f},{longitude:.5f},{zoom},{width}x{height}"
+            cached = _tile_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
             # Build the Mapbox Static API URL for terrain map
-            url = f"https://api.mapbox.com/styles/v1/mapbox/outdoors-v11/static/pin-s+FF4B4B({longitude},{latitude})/{longitude},{latitude},{zoom}/{width}x{height}?access_token={self.mapbox_api_key}"
+            url = f"https://api.mapbox.com/styles/v1/mapbox/outdoors-v11/static/pin-s+FF4B4B({longitude},{latitude})/{longitude},{latitude},{zoom}/{width}x{height}?{self._token_qs}"
             
-            # Make the request
-            response = requests.get(url)
-            response.raise_for_status()
+            # Make the request (or read it from the disk cache)
+            content = self._cached_fetch(url)
             
-            return response.content
+            _tile_cache.set(cache_key, content)
+            return content
             
         except Exception as e:
             print(f"Error getting terrain map: {str(e)}")
             return None
     
     def generate_comparison_html(self, image_path: str, latitude: float, longitude: float, 
-                              zoom: int = 15, width: int = 500, height: int = 500) -> str:
+                              zoom: int = 15, width: int = 500, height: int = 500,
+                              static_dir: Optional[str] = None, url_prefix: str = "") -> str:
         """
         Generate HTML for displaying a comparison between an image and maps.
         
@@ -279,52 +583,69 @@ class MapboxService:
             zoom: Zoom level for the maps
             width: Width of each image in the comparison
             height: Height of each image in the comparison
+            static_dir: Directory served as static files; when given, images are written there
+                and referenced by URL instead of being embedded as base64
+            url_prefix: URL under which static_dir is served
             
         Returns:
             HTML string with the comparison layout
         """
         try:
-            # Get maps at different styles
-            satellite_img = self.get_satellite_image(latitude, longitude, zoom, width, height)
-            street_img = self.get_street_map(latitude, longitude, zoom, width, height)
-            terrain_img = self.get_terrain_map(latitude, longitude, zoom, width, height)
-            
-            # Read the drone image
-            with open(image_path, "rb") as img_file:
-                drone_img = img_file.read()
-                
-            # Convert images to base64 for embedding in HTML
-            satellite_b64 = base64.b64encode(satellite_img).decode('utf-8') if satellite_img else ""
-            street_b64 = base64.b64encode(street_img).decode('utf-8') if street_img else ""
-            terrain_b64 = base64.b64encode(terrain_img).decode('utf-8') if terrain_img else ""
-            drone_b64 = base64.b64encode(drone_img).decode('utf-8')
-            
-            # Create HTML
-            html = f"""
-            <div style="display: flex; flex-direction: column; font-family: Arial, sans-serif;">
-                <div style="display: flex; justify-content: space-between; margin-bottom: 20px;">
-                    <div style="width: {width}px;">
-                        <h3 style="text-align: center;">Drone Image</h3>
-                        <img src="data:image/jpeg;base64,{drone_b64}" style="width: 100%; border: 2px solid #333; border-radius: 5px;" />
-                        <p style="text-align: center;">COORDINATES: {latitude:.6f}, {longitude:.6f}</p>
-                    </div>
-                    <div style="width: {width}px;">
-                        <h3 style="text-align: center;">Satellite View</h3>
-                        {f'<img src="data:image/png;base64,{satellite_b64}" style="width: 100%; border: 2px solid #333; border-radius: 5px;" />' if satellite_b64 else '<div style="width: 100%; height: {height}px; display: flex; align-items: center; justify-content: center; background-color: #f0f0f0; border: 2px solid #333; border-radius: 5px;"><p>Satellite image not available</p></div>'}
-                    </div>
-                </div>
-                <div style="display: flex; justify-content: space-between;">
-                    <div style="width: {width}px;">
-                        <h3 style="text-align: center;">Street Map</h3>
-                        {f'<img src="data:image/png;base64,{street_b64}" style="width: 100%; border: 2px solid #333; border-radius: 5px;" />' if street_b64 else '<div style="width: 100%; height: {height}px; display: flex; align-items: center; justify-content: center; background-color: #f0f0f0; border: 2px solid #333; border-radius: 5px;"><p>Street map not available</p></div>'}
-                    </div>
-                    <div style="width: {width}px;">
-                        <h3 style="text-align: center;">Terrain Map</h3>
-                        {f'<img src="data:image/png;base64,{terrain_b64}" style="width: 100%; border: 2px solid #333; border-radius: 5px;" />' if terrain_b64 else '<div style="width: 100%; height: {height}px; display: flex; align-items: center; justify-content: center; background-color: #f0f0f0; border: 2px solid #333; border-radius: 5px;"><p>Terrain map not available</p></div>'}
-                    </div>
-                </div>
-            </div>
-            """
+            # Fetch the three map styles concurrently
+            satellite_future = self._executor.submit(self.get_satellite_image, latitude, longitude, zoom, width, height)
+            street_future = self._executor.submit(self.get_street_map, latitude, longitude, zoom, width, height)
+            terrain_future = self._executor.submit(self.get_terrain_map, latitude, longitude, zoom, width, height)
+            
+            def image_src(data, mime_type: str, extension: str) -> str:
+                # data is any bytes-like object (bytes or a read-only mmap)
+                if not data:
+                    return ""
+                if static_dir is None:
+                    # Embed as a data URI
+                    return f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}"
+                # Content-addressed file name: repeated renders reuse the same file
+                name = f"{hashlib.blake2b(data, digest_size=16).hexdigest()}{extension}"
+                path = os.path.join(static_dir, name)
+                if not os.path.exists(path):
+                    with open(path, "wb") as f:
+                        f.write(data)
+                return f"{url_prefix.rstrip('/')}/{name}"
+            
+            if static_dir is not None:
+                os.makedirs(static_dir, exist_ok=True)
+            
+            # Encode the drone image while the maps download; large files are mapped
+            # into memory so they are encoded/hashed without an extra bytes copy
+            drone_extension = os.path.splitext(image_path)[1] or ".jpg"
+            with open(image_path, "rb") as drone_file:
+                if os.fstat(drone_file.fileno()).st_size < _MMAP_MIN_BYTES:
+                    drone_src = image_src(drone_file.read(), "image/jpeg", drone_extension)
+                else:
+                    with mmap.mmap(drone_file.fileno(), 0, access=mmap.ACCESS_READ) as drone_map:
+                        drone_src = image_src(drone_map, "image/jpeg", drone_extension)
+            
+            def map_result(future):
+                # A map that takes too long is shown as "not available"
+                try:
+                    return future.result(timeout=_COMPARISON_FETCH_TIMEOUT)
+                except FutureTimeoutError:
+                    return None
+            
+            satellite_src = image_src(map_result(satellite_future), "image/png", ".png")
+            street_src = image_src(map_result(street_future), "image/png", ".png")
+            terrain_src = image_src(map_result(terrain_future), "image/png", ".png")
+            
+            # Render the comparison layout (template compiled once at import)
+            html = _COMPARISON_TMPL.render(
+                width=width,
+                height=height,
+                latitude=latitude,
+                longitude=longitude,
+                drone_src=drone_src,
+                satellite_src=satellite_src,
+                street_src=street_src,
+                terrain_src=terrain_src
+            )
             
             return html
             
@@ -339,6 +660,32 @@ class MapboxService:
             """
             return error_html
     
+    def prewarm_interactive_map(self, latitude: float, longitude: float, zoom: int = 15) -> None:
+        """
+        Start rendering the interactive map in the background, so a later
+        generate_interactive_map call for the same view finds it ready.
+        
+        Args:
+            latitude: Latitude in decimal degrees
+            longitude: Longitude in decimal degrees
+            zoom: Zoom level
+        """
+        cache_key = f"mapbox,{self._token_tag},{latitude:.5f},{longitude:.5f},{zoom}"
+        if _map_html_cache.get(cache_key) is not None:
+            return
+        
+        with self._pending_lock:
+            if cache_key in self._pending_maps:
+                return
+            future = self._prerender_pool.submit(self._render_interactive_map, latitude, longitude, zoom, cache_key)
+            self._pending_maps[cache_key] = future
+        
+        def forget(_future, key=cache_key):
+            with self._pending_lock:
+                self._pending_maps.pop(key, None)
+        
+        future.add_done_callback(forget)
+    
     def generate_interactive_map(self, latitude: float, longitude: float, zoom: int = 15) -> str:
         """
         Generate an interactive map with Mapbox tiles.
@@ -351,6 +698,21 @@ class MapboxService:
         Returns:
             HTML string containing the interactive map
         """
+        cache_key = f"mapbox,{self._token_tag},{latitude:.5f},{longitude:.5f},{zoom}"
+        cached_html = _map_html_cache.get(cache_key)
+        if cached_html is not None:
+            return cached_html
+        
+        # Wait for a render already started by prewarm_interactive_map instead of repeating it
+        with self._pending_lock:
+            future = self._pending_maps.get(cache_key)
+        if future is not None:
+            return future.result()
+        
+        return self._render_interactive_map(latitude, longitude, zoom, cache_key)
+    
+    def _render_interactive_map(self, latitude: float, longitude: float, zoom: int, cache_key: str) -> str:
+        """Build the folium map HTML and store it under cache_key."""
         try:
             # Create a map centered at the specified location
             m = folium.Map(
@@ -358,25 +720,25 @@ class MapboxService:
                 zoom_start=zoom,
                 width='100%',
                 height='400px',
-                tiles='https://api.mapbox.com/styles/v1/mapbox/satellite-streets-v11/tiles/{z}/{x}/{y}?access_token=' + self.mapbox_api_key,
+                tiles='https://api.mapbox.com/styles/v1/mapbox/satellite-streets-v11/tiles/{z}/{x}/{y}?' + self._token_qs,
                 attr='Mapbox'
             )
             
             # Add layer control to switch between map styles
             folium.TileLayer(
-                tiles='https://api.mapbox.com/styles/v1/mapbox/streets-v11/tiles/{z}/{x}/{y}?access_token=' + self.mapbox_api_key,
+                tiles='https://api.mapbox.com/styles/v1/mapbox/streets-v11/tiles/{z}/{x}/{y}?' + self._token_qs,
                 attr='Mapbox Streets',
                 name='Streets'
             ).add_to(m)
             
             folium.TileLayer(
-                tiles='https://api.mapbox.com/styles/v1/mapbox/satellite-v9/tiles/{z}/{x}/{y}?access_token=' + self.mapbox_api_key,
+                tiles='https://api.mapbox.com/styles/v1/mapbox/satellite-v9/tiles/{z}/{x}/{y}?' + self._token_qs,
                 attr='Mapbox Satellite',
                 name='Satellite'
             ).add_to(m)
             
             folium.TileLayer(
-                tiles='https://api.mapbox.com/styles/v1/mapbox/outdoors-v11/tiles/{z}/{x}/{y}?access_token=' + self.mapbox_api_key,
+                tiles='https://api.mapbox.com/styles/v1/mapbox/outdoors-v11/tiles/{z}/{x}/{y}?' + self._token_qs,
                 attr='Mapbox Outdoors',
                 name='Terrain'
             ).add_to(m)
@@ -403,8 +765,9 @@ class MapboxService:
             folium.LayerControl().add_to(m)
             
             # Get the HTML
-            html = m._repr_html_()
+            html = _HTML_WHITESPACE_RE.sub("\n", m._repr_html_())
             
+            _map_html_cache.set(cache_key, html)
             return html
             
         except Exception as e:
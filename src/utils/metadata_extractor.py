@@ -1,7 +1,14 @@
 import exifread
 import os
+import copy
 from datetime import datetime
-from typing import Dict, Any, Optional, Tuple
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional, Tuple, List
+
+# Minutes and seconds to degrees
+_INV_60 = 1.0 / 60.0
+_INV_3600 = 1.0 / 3600.0
 
 class MetadataExtractor:
     """
@@ -19,18 +26,48 @@ class MetadataExtractor:
         Returns:
             Dictionary containing all metadata
         """
-        if not os.path.exists(image_path):
-            raise FileNotFoundError(f"Image file not found: {image_path}")
+        try:
+            # One stat for existence, size and mtime
+            st = os.stat(image_path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Image file not found: {image_path}") from None
+        
+        # Re-processing an unchanged file is served from the cache
+        return copy.deepcopy(_extract_metadata_cached(image_path, st.st_mtime_ns, st.st_size))
+    
+    @staticmethod
+    def extract_metadata_batch(image_paths: List[str], max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Extract metadata from many image files in parallel worker processes.
         
+        Args:
+            image_paths: Paths to the image files
+            max_workers: Number of worker processes (defaults to the CPU count)
+            
+        Returns:
+            Metadata dictionaries in the same order as image_paths
+        """
+        if len(image_paths) < 2:
+            return [MetadataExtractor.extract_metadata(path) for path in image_paths]
+        
+        # EXIF parsing is CPU-bound pure Python, so processes (not threads) scale across cores;
+        # chunksize amortises the inter-process round trips
+        with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            return list(executor.map(MetadataExtractor.extract_metadata, image_paths, chunksize=8))
+    
+    @staticmethod
+    def _extract_metadata_uncached(image_path: str, mtime_ns: int, file_size: int) -> Dict[str, Any]:
+        """Parse metadata for a file whose stat results are already known."""
+        # details=False skips MakerNote decoding and thumbnail extraction, neither of which is used
         with open(image_path, 'rb') as image_file:
-            tags = exifread.process_file(image_file, details=True)
+            tags = exifread.process_file(image_file, details=False)
             
         # Convert to a more manageable dictionary
         metadata = {
             "filename": os.path.basename(image_path),
-            "file_size": os.path.getsize(image_path),
-            "file_modified": datetime.fromtimestamp(os.path.getmtime(image_path)).isoformat(),
-            "exif_data": {str(k): str(v) for k, v in tags.items() if k not in ('JPEGThumbnail', 'TIFFThumbnail')}
+            "file_size": file_size,
+            "file_modified": datetime.fromtimestamp(mtime_ns / 1e9).isoformat(),
+            "exif_data": {str(k): str(v) for k, v in tags.items()}
         }
         
         # Extract GPS data if available
@@ -51,20 +88,20 @@ class MetadataExtractor:
         Returns:
             Dictionary with latitude, longitude and reference data, or None if not available
         """
-        # Check if GPS tags exist
-        if not any(tag.startswith('GPS') for tag in tags):
+        # Latitude and longitude are the only GPS tags required
+        if 'GPS GPSLatitude' not in tags or 'GPS GPSLongitude' not in tags:
             return None
             
         try:
             # Extract latitude
             lat_ref = str(tags.get('GPS GPSLatitudeRef', 'N'))
-            lat = MetadataExtractor._convert_to_degrees(tags.get('GPS GPSLatitude'))
+            lat = MetadataExtractor._convert_to_degrees(tags['GPS GPSLatitude'])
             if lat_ref == 'S':
                 lat = -lat
                 
             # Extract longitude
             lon_ref = str(tags.get('GPS GPSLongitudeRef', 'E'))
-            lon = MetadataExtractor._convert_to_degrees(tags.get('GPS GPSLongitude'))
+            lon = MetadataExtractor._convert_to_degrees(tags['GPS GPSLongitude'])
             if lon_ref == 'W':
                 lon = -lon
                 
@@ -106,11 +143,11 @@ class MetadataExtractor:
         if not value:
             return 0.0
             
-        degrees = float(str(value.values[0]))
-        minutes = float(str(value.values[1]))
-        seconds = float(str(value.values[2]))
+        # exifread Ratio values are Fractions: convert them directly instead of
+        # formatting and re-parsing (which also failed on values like "3123/100")
+        degrees, minutes, seconds = value.values[:3]
         
-        return degrees + (minutes / 60.0) + (seconds / 3600.0)
+        return float(degrees) + float(minutes) * _INV_60 + float(seconds) * _INV_3600
     
     @staticmethod
     def get_image_dimensions(metadata: Dict[str, Any]) -> Optional[Tuple[int, int]]:
@@ -143,4 +180,10 @@ class MetadataExtractor:
             except (ValueError, IndexError):
                 pass
                 
-        return None 
\ No newline at end of file
+        return None 
+
+
+@lru_cache(maxsize=256)
+def _extract_metadata_cached(image_path: str, mtime_ns: int, file_size: int) -> Dict[str, Any]:
+    # Keyed by mtime and size so a modified file is parsed again
+    return MetadataExtractor._extract_metadata_uncached(image_path, mtime_ns, file_size)
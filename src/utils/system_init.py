@@ -5,11 +5,17 @@ Verifica y configura directorios, dependencias y servicios necesarios.
 
 import os
 import sys
+import time
+import re
+import fnmatch
 import logging
 import shutil
-import json
+import orjson
+import argparse
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 # Configure logging
 logging.basicConfig(
@@ -18,6 +24,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Raíz del proyecto en sys.path una sola vez, para importar siempre como src.*
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_ROOT = os.path.abspath(os.path.join(_HERE, "..", ".."))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+# Resultado de la última comprobación correcta de la base de datos en este proceso
+_db_connection_ok: Optional[bool] = None
+
+def _module_available(module_name: str) -> bool:
+    """Comprueba si un módulo se puede importar, sin importarlo."""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except ImportError:
+        return False
+
 class SystemInitializer:
     """
     Clase para inicializar el sistema y verificar que todos los componentes
@@ -43,8 +65,11 @@ class SystemInitializer:
             "database": False,
             "api_keys": {},
             "environment": os.environ.get("ENVIRONMENT", "development"),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": datetime.now()
         }
+        # Instancias de servicios creadas bajo demanda por get_services()
+        self._services: Optional[Dict[str, Any]] = None
+        self._service_errors: Dict[str, str] = {}
         logger.info("Iniciando verificación del sistema")
     
     def check_directories(self) -> Dict[str, bool]:
@@ -98,14 +123,17 @@ class SystemInitializer:
         Returns:
             True si la conexión es exitosa, False en caso contrario
         """
+        global _db_connection_ok
         logger.info("Verificando conexión a la base de datos")
         
+        # Una conexión ya verificada en este proceso no se vuelve a comprobar
+        if _db_connection_ok:
+            self.status["database"] = True
+            return True
+        
         try:
             # Importar gestor de base de datos
-            try:
-                from src.models.database import db_manager
-            except ImportError:
-                from models.database import db_manager
+            from src.models.database import db_manager
             
             # Verificar conexión
             connection_ok = db_manager.check_db_connection()
@@ -118,6 +146,7 @@ class SystemInitializer:
                 logger.error("No se pudo conectar a la base de datos")
             
             self.status["database"] = connection_ok
+            _db_connection_ok = connection_ok
             return connection_ok
             
         except Exception as e:
@@ -126,10 +155,14 @@ class SystemInitializer:
             self.status["database_error"] = str(e)
             return False
     
-    def check_services(self) -> Dict[str, bool]:
+    def check_services(self, deep_check: bool = False) -> Dict[str, bool]:
         """
         Verifica los servicios externos requeridos.
         
+        Args:
+            deep_check: Instanciar los servicios (carga modelos y clientes) en lugar de
+                comprobar solo que sus módulos y configuración están disponibles
+        
         Returns:
             Diccionario con estado de los servicios
         """
@@ -143,78 +176,112 @@ class SystemInitializer:
             "mapbox_service": False
         }
         
-        # Verificar LLM
-        try:
+        if not deep_check:
+            # Comprobación ligera: configuración del servicio, sin crear el cliente
             try:
                 from src.models.vision_llm import VisionLLM
-            except ImportError:
-                from models.vision_llm import VisionLLM
                 
-            # Verificar inicialización
-            vision_llm = VisionLLM()
-            services["vision_llm"] = True
-            logger.info("Servicio VisionLLM inicializado correctamente")
+                services["vision_llm"], error = VisionLLM.probe()
+                if error:
+                    services["vision_llm_error"] = error
+            except Exception as e:
+                services["vision_llm_error"] = str(e)
+            
+            services["object_detector"] = _module_available("src.models.object_detector")
+            if not services["object_detector"]:
+                services["object_detector_error"] = "Módulo object_detector no disponible"
+            
+            self.status["services"] = services
+            return services
+        
+        # Verificación completa: instanciar los servicios (se conservan para get_services)
+        instances = self.get_services()
+        for name in ("vision_llm", "object_detector"):
+            services[name] = instances.get(name) is not None
+            if not services[name]:
+                services[f"{name}_error"] = self._service_errors.get(name, "")
+        
+        # Actualizar estado
+        self.status["services"] = services
+        return services
+    
+    def get_services(self) -> Dict[str, Any]:
+        """
+        Devuelve las instancias de los servicios, creándolas solo en la primera llamada.
+        
+        Returns:
+            Diccionario con las instancias (None si el servicio no se pudo crear)
+        """
+        if self._services is not None:
+            return self._services
+        
+        services: Dict[str, Any] = {}
+        
+        # LLM de visión
+        try:
+            from src.models.vision_llm import get_vision_llm
             
+            services["vision_llm"] = get_vision_llm()
+            logger.info("Servicio VisionLLM inicializado correctamente")
         except Exception as e:
             logger.error(f"Error al inicializar VisionLLM: {str(e)}")
-            services["vision_llm_error"] = str(e)
+            services["vision_llm"] = None
+            self._service_errors["vision_llm"] = str(e)
         
-        # Verificar detector de objetos
+        # Detector de objetos
         try:
-            try:
-                from src.models.object_detector import ObjectDetector
-            except ImportError:
-                from models.object_detector import ObjectDetector
-                
-            # Verificar inicialización
-            object_detector = ObjectDetector()
-            services["object_detector"] = True
-            logger.info("Servicio ObjectDetector inicializado correctamente")
+            from src.models.object_detector import ObjectDetector
             
+            services["object_detector"] = ObjectDetector()
+            logger.info("Servicio ObjectDetector inicializado correctamente")
         except Exception as e:
             logger.error(f"Error al inicializar ObjectDetector: {str(e)}")
-            services["object_detector_error"] = str(e)
+            services["object_detector"] = None
+            self._service_errors["object_detector"] = str(e)
         
-        # Actualizar estado
-        self.status["services"] = services
+        self._services = services
         return services
     
-    def initialize_system(self) -> Dict[str, Any]:
+    def initialize_system(self, deep_check: bool = False) -> Dict[str, Any]:
         """
         Realiza todas las verificaciones e inicializaciones.
         
+        Args:
+            deep_check: Instanciar los servicios en lugar de la comprobación ligera
+        
         Returns:
             Diccionario con el estado completo del sistema
         """
-        # Verificar directorios
-        self.check_directories()
-        
-        # Verificar claves API
-        self.check_api_keys()
-        
-        # Verificar base de datos
-        self.check_database()
-        
-        # Verificar servicios
-        self.check_services()
+        # Las verificaciones son independientes y cada una escribe en su propia
+        # clave de self.status, así que se ejecutan en paralelo
+        with ThreadPoolExecutor(max_workers=4, thread_name_prefix="system-check") as executor:
+            futures = [
+                executor.submit(self.check_directories),
+                executor.submit(self.check_api_keys),
+                executor.submit(self.check_database),
+                executor.submit(self.check_services, deep_check=deep_check)
+            ]
+            for future in futures:
+                future.result()
         
         # Generar archivo de estado
         try:
             status_path = "data/system_status.json"
-            with open(status_path, "w") as f:
-                json.dump(self.status, f, indent=2)
+            with open(status_path, "wb") as f:
+                f.write(orjson.dumps(self.status, option=orjson.OPT_INDENT_2))
             logger.info(f"Estado del sistema guardado en {status_path}")
         except Exception as e:
             logger.error(f"Error al guardar estado del sistema: {str(e)}")
         
         return self.status
     
-    def clean_temp_files(self, max_age_days: int = 7) -> int:
+    def clean_temp_files(self, max_age_days: int = 7, patterns: Optional[List[str]] = None) -> int:
         """
         Limpia archivos temporales antiguos.
         
         Args:
             max_age_days: Edad máxima en días para los archivos
+            patterns: Patrones glob de los nombres a eliminar (p. ej. ["*.jpg"]); None = todos
             
         Returns:
             Número de archivos eliminados
@@ -223,49 +290,64 @@ class SystemInitializer:
         
         # Directorios a limpiar
         temp_dirs = ["data/uploads", "data/frames", "data/results", "data/cache"]
-        now = datetime.now()
+        # Se eliminan los archivos con más de max_age_days días completos de antigüedad
+        cutoff = time.time() - (max_age_days + 1) * 86400
         count = 0
         
+        # Los patrones se compilan una sola vez en lugar de usar fnmatch por archivo
+        name_filter = None
+        if patterns:
+            name_filter = re.compile("|".join(fnmatch.translate(p) for p in patterns))
+        
         for temp_dir in temp_dirs:
-            if not os.path.exists(temp_dir):
+            try:
+                entries = os.scandir(temp_dir)
+            except FileNotFoundError:
                 continue
-                
-            for filename in os.listdir(temp_dir):
-                file_path = os.path.join(temp_dir, filename)
-                
-                if os.path.isfile(file_path):
-                    file_age = datetime.fromtimestamp(os.path.getmtime(file_path))
-                    age_days = (now - file_age).days
-                    
-                    if age_days > max_age_days:
-                        try:
-                            os.remove(file_path)
-                            count += 1
-                            logger.debug(f"Eliminado archivo temporal: {file_path}")
-                        except Exception as e:
-                            logger.error(f"Error al eliminar archivo {file_path}: {str(e)}")
+            
+            # Una sola pasada: tipo y mtime salen de la entrada del directorio
+            with entries:
+                for entry in entries:
+                    try:
+                        if name_filter is not None and not name_filter.match(entry.name):
+                            continue
+                        if not entry.is_file() or entry.stat().st_mtime > cutoff:
+                            continue
+                        os.remove(entry.path)
+                        count += 1
+                        logger.debug(f"Eliminado archivo temporal: {entry.path}")
+                    except Exception as e:
+                        logger.error(f"Error al eliminar archivo {entry.path}: {str(e)}")
         
         logger.info(f"Limpieza completada: {count} archivos eliminados")
         return count
 
 # Función principal para inicializar el sistema
-def initialize_system() -> Dict[str, Any]:
+def initialize_system(deep_check: bool = False) -> Dict[str, Any]:
     """
     Inicializa el sistema completo.
     
+    Args:
+        deep_check: Instanciar los servicios en lugar de la comprobación ligera
+    
     Returns:
         Estado del sistema
     """
     initializer = SystemInitializer()
-    return initializer.initialize_system()
+    return initializer.initialize_system(deep_check=deep_check)
 
 # Ejecución directa
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verificación del sistema Drone-OSINT-GeoSpy")
+    parser.add_argument("--deep-check", action="store_true",
+                        help="Instanciar los servicios (carga modelos) en lugar de la comprobación ligera")
+    args = parser.parse_args()
+    
     # Inicializar sistema
-    status = initialize_system()
+    status = initialize_system(deep_check=args.deep_check)
     
     # Mostrar estado
-    print(json.dumps(status, indent=2))
+    print(orjson.dumps(status, option=orjson.OPT_INDENT_2).decode())
     
     # Verificar si hay errores críticos
     critical_error = False
@@ -4,6 +4,71 @@ import time
 import numpy as np
 from typing import List, Tuple, Optional, Generator
 import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# JPEG quality for saved frames
+_JPEG_QUALITY = 85
+
+# Encoder parameters shared by every frame write
+_JPEG_ENCODE_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, _JPEG_QUALITY]
+
+# File extensions of saved frames
+_EXT_ALLOW = frozenset({".jpg"})
+
+# Stream frames waiting to be encoded beyond this are dropped instead of queued
+_MAX_PENDING_STREAM_WRITES = 8
+
+def _open_capture(source) -> cv2.VideoCapture:
+    """
+    Open a video file or stream URL with FFmpeg hardware-accelerated decoding when the
+    platform offers it (VAAPI, D3D11, ...), falling back to the default software capture.
+    Camera indices always use the default backend.
+    """
+    if isinstance(source, str) and os.getenv("VIDEO_HW_ACCELERATION", "1") != "0":
+        try:
+            cap = cv2.VideoCapture(
+                source,
+                cv2.CAP_FFMPEG,
+                [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+            )
+            if cap.isOpened():
+                return cap
+            cap.release()
+        except (cv2.error, AttributeError):
+            pass  # OpenCV build without FFmpeg or hardware acceleration support
+    return cv2.VideoCapture(source)
+
+# Stream frames whose dHash differs from the last saved one in fewer bits are duplicates
+_DUPLICATE_HASH_DISTANCE = 6
+
+def _frame_hash(frame: np.ndarray) -> int:
+    """64-bit difference hash (dHash) of a frame, computed on a 9x8 grayscale thumbnail."""
+    small = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (9, 8), interpolation=cv2.INTER_AREA)
+    return int(np.packbits(small[:, 1:] > small[:, :-1]).view(np.uint64)[0])
+
+def _downscale(frame: np.ndarray, max_side: int, dst: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Shrink a frame so its longest side is at most max_side pixels (0 disables).
+    A dst array of the resulting size is resized into in place.
+    """
+    height, width = frame.shape[:2]
+    scale = max_side / max(height, width) if max_side else 1.0
+    if scale >= 1.0:
+        return frame
+    return cv2.resize(
+        frame,
+        (max(1, int(width * scale)), max(1, int(height * scale))),
+        dst=dst,
+        interpolation=cv2.INTER_AREA
+    )
+
+def _write_jpeg(output_path: str, frame: np.ndarray) -> None:
+    """Encode a frame as JPEG and write the bytes (runs on the writer pool)."""
+    ok, buffer = cv2.imencode(".jpg", frame, _JPEG_ENCODE_PARAMS)
+    if not ok:
+        raise ValueError(f"Failed to encode frame: {output_path}")
+    with open(output_path, "wb") as f:
+        f.write(buffer)
 
 class VideoProcessor:
     """
@@ -22,13 +87,23 @@ class VideoProcessor:
         self._ensure_dir_exists(output_dir)
         self.current_video_capture = None
         self.processing_thread = None
+        # Last saved stream frame and its path, kept in memory
+        self._latest_lock = threading.Lock()
+        self.latest_frame_path = None
+        self._latest_frame = None
+        # JPEG encoding and disk writes run here so decoding never waits on them
+        # (OpenCV releases the GIL while encoding)
+        self._writer_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="frame-writer")
+        self._stream_write_slots = threading.BoundedSemaphore(_MAX_PENDING_STREAM_WRITES)
+        # dHash of the last stream frame sent to the writers
+        self._last_hash = None
     
     def _ensure_dir_exists(self, directory: str):
         """Create directory if it doesn't exist."""
-        if not os.path.exists(directory):
-            os.makedirs(directory)
+        os.makedirs(directory, exist_ok=True)
     
-    def extract_frames(self, video_path: str, interval_sec: float = 1.0, max_frames: int = 10) -> List[str]:
+    def extract_frames(self, video_path: str, interval_sec: float = 1.0, max_frames: int = 10,
+                       max_side: int = 1280) -> List[str]:
         """
         Extract frames from a video file at specified intervals.
         
@@ -36,6 +111,7 @@ class VideoProcessor:
             video_path: Path to the video file
             interval_sec: Time interval between frames in seconds
             max_frames: Maximum number of frames to extract
+            max_side: Longest side of the saved frames in pixels (0 keeps full resolution)
             
         Returns:
             List of paths to extracted frames
@@ -44,23 +120,28 @@ class VideoProcessor:
             raise FileNotFoundError(f"Video file not found: {video_path}")
             
         # Open the video file
-        cap = cv2.VideoCapture(video_path)
+        cap = _open_capture(video_path)
         if not cap.isOpened():
             raise ValueError(f"Failed to open video file: {video_path}")
             
         # Get video properties
         fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_interval = int(fps * interval_sec)
+        frame_interval = max(1, int(fps * interval_sec))
         
         extracted_frames = []
+        pending_writes = []
         frame_count = 0
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         
-        # Extract frames at intervals
-        for i in range(0, min(total_frames, max_frames * frame_interval), frame_interval):
-            cap.set(cv2.CAP_PROP_POS_FRAMES, i)
-            ret, frame = cap.read()
+        # Walk the video sequentially: grab() advances without converting the frame,
+        # retrieve() decodes only the frames we keep (no per-frame keyframe seek)
+        for index in range(min(total_frames, max_frames * frame_interval)):
+            if not cap.grab():
+                break
+            if index % frame_interval:
+                continue
             
+            ret, frame = cap.retrieve()
             if not ret:
                 break
                 
@@ -68,8 +149,9 @@ class VideoProcessor:
             filename = f"{os.path.basename(video_path)}_frame_{frame_count:04d}.jpg"
             output_path = os.path.join(self.output_dir, filename)
             
-            # Save the frame
-            cv2.imwrite(output_path, frame)
+            # Save the frame in the background (retrieve() returns a fresh array, so no copy is needed)
+            frame = _downscale(frame, max_side)
+            pending_writes.append(self._writer_pool.submit(_write_jpeg, output_path, frame))
             extracted_frames.append(output_path)
             
             frame_count += 1
@@ -77,15 +159,21 @@ class VideoProcessor:
                 break
                 
         cap.release()
+        
+        # Every frame is on disk before the paths are handed out
+        wait(pending_writes)
+        for future in pending_writes:
+            future.result()
         return extracted_frames
     
-    def start_stream_processing(self, stream_url: str, process_interval_sec: float = 2.0):
+    def start_stream_processing(self, stream_url: str, process_interval_sec: float = 2.0, max_side: int = 1280):
         """
         Start processing a live video stream in a separate thread.
         
         Args:
             stream_url: URL or camera index for the video stream
             process_interval_sec: Time interval between frame processing
+            max_side: Longest side of the saved frames in pixels (0 keeps full resolution)
         """
         if self.is_processing:
             self.stop_stream_processing()
@@ -93,62 +181,83 @@ class VideoProcessor:
         self.is_processing = True
         self.processing_thread = threading.Thread(
             target=self._process_stream,
-            args=(stream_url, process_interval_sec),
+            args=(stream_url, process_interval_sec, max_side),
             daemon=True
         )
         self.processing_thread.start()
     
-    def _process_stream(self, stream_url: str, process_interval_sec: float):
+    def _process_stream(self, stream_url: str, process_interval_sec: float, max_side: int = 1280):
         """
         Process a live video stream, extracting frames at intervals.
         
         Args:
             stream_url: URL or camera index for the video stream
             process_interval_sec: Time interval between frame processing
+            max_side: Longest side of the saved frames in pixels (0 keeps full resolution)
         """
         # Convert string to int if it's a camera index
         if stream_url.isdigit():
             stream_url = int(stream_url)
             
         # Open the video stream
-        self.current_video_capture = cv2.VideoCapture(stream_url)
+        self.current_video_capture = _open_capture(stream_url)
         
         if not self.current_video_capture.isOpened():
             print(f"Error: Could not open video stream at {stream_url}")
             self.is_processing = False
             return
+        
+        # Keep only the newest frame buffered so the retrieved frame is current
+        self.current_video_capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
             
         frame_count = 0
-        last_process_time = time.time()
+        last_process_time = time.monotonic()
+        self._last_hash = None
         
         try:
             while self.is_processing:
-                # Read a frame
-                ret, frame = self.current_video_capture.read()
-                
-                if not ret:
+                # Advance the stream; grab() blocks at the stream's own frame rate and
+                # skips the BGR conversion for frames that are not saved
+                if not self.current_video_capture.grab():
                     print("Error: Failed to read frame from stream")
                     break
                     
-                current_time = time.time()
+                current_time = time.monotonic()
                 elapsed = current_time - last_process_time
                 
                 # Process frame at specified interval
                 if elapsed >= process_interval_sec:
+                    ret, frame = self.current_video_capture.retrieve()
+                    if not ret:
+                        print("Error: Failed to decode frame from stream")
+                        break
+                    
+                    last_process_time = current_time
+                    
+                    # Skip frames that look the same as the last saved one (e.g. while hovering)
+                    frame_hash = _frame_hash(frame)
+                    if (self._last_hash is not None
+                            and (frame_hash ^ self._last_hash).bit_count() < _DUPLICATE_HASH_DISTANCE):
+                        continue
+                    
                     # Generate output filename
-                    timestamp = int(current_time)
+                    timestamp = int(time.time())
                     filename = f"stream_frame_{timestamp}.jpg"
                     output_path = os.path.join(self.output_dir, filename)
                     
-                    # Save the frame
-                    cv2.imwrite(output_path, frame)
-                    print(f"Saved frame: {output_path}")
+                    # Save the frame on the writer pool; if the writers are saturated,
+                    # drop this frame rather than stall the stream
+                    if self._stream_write_slots.acquire(blocking=False):
+                        self._last_hash = frame_hash
+                        frame = _downscale(frame, max_side)
+                        future = self._writer_pool.submit(_write_jpeg, output_path, frame)
+                        future.add_done_callback(
+                            lambda done, path=output_path, saved=frame: self._on_stream_frame_written(done, path, saved)
+                        )
+                    else:
+                        print(f"Frame writers busy, skipping frame: {output_path}")
                     
-                    last_process_time = current_time
                     frame_count += 1
-                    
-                # Don't max out CPU - small delay between frame reads
-                time.sleep(0.01)
                 
         except Exception as e:
             print(f"Error in stream processing: {str(e)}")
@@ -157,6 +266,18 @@ class VideoProcessor:
                 self.current_video_capture.release()
             self.is_processing = False
     
+    def _on_stream_frame_written(self, future, output_path: str, frame: np.ndarray):
+        """Publish a stream frame once it is on disk."""
+        self._stream_write_slots.release()
+        if future.exception() is not None:
+            print(f"Error saving frame {output_path}: {future.exception()}")
+            return
+        print(f"Saved frame: {output_path}")
+        
+        with self._latest_lock:
+            self.latest_frame_path = output_path
+            self._latest_frame = frame
+    
     def stop_stream_processing(self):
         """Stop the video stream processing."""
         self.is_processing = False
@@ -168,18 +289,29 @@ class VideoProcessor:
     
     def get_latest_frame(self) -> Optional[Tuple[np.ndarray, str]]:
         """
-        Get the latest frame from the output directory.
+        Get the latest frame, from memory when a stream has saved one, otherwise
+        from the output directory.
         
         Returns:
             Tuple of (frame as numpy array, frame path) or None if no frames exist
         """
-        files = [f for f in os.listdir(self.output_dir) if f.endswith('.jpg')]
-        if not files:
+        # Last stream frame saved by this processor: no directory scan or JPEG decode
+        with self._latest_lock:
+            if self._latest_frame is not None:
+                return (self._latest_frame.copy(), self.latest_frame_path)
+        
+        # Single directory pass keeping only the most recently modified frame
+        latest_entry, latest_mtime = None, -1.0
+        with os.scandir(self.output_dir) as entries:
+            for entry in entries:
+                if os.path.splitext(entry.name)[1] in _EXT_ALLOW and entry.is_file():
+                    mtime = entry.stat().st_mtime
+                    if mtime > latest_mtime:
+                        latest_entry, latest_mtime = entry, mtime
+        
+        if latest_entry is None:
             return None
-            
-        # Get the most recent file
-        files.sort(reverse=True)
-        latest_frame_path = os.path.join(self.output_dir, files[0])
+        latest_frame_path = latest_entry.path
         
         # Read the frame
         frame = cv2.imread(latest_frame_path)
@@ -188,13 +320,19 @@ class VideoProcessor:
             
         return (frame, latest_frame_path)
     
-    def get_frame_generator(self, video_path: str, interval_sec: float = 0.5) -> Generator[Tuple[np.ndarray, float], None, None]:
+    def get_frame_generator(self, video_path: str, interval_sec: float = 0.5,
+                            max_side: int = 1280, copy: bool = False) -> Generator[Tuple[np.ndarray, float], None, None]:
         """
         Create a generator that yields frames from a video file at specified intervals.
         
+        Frames are decoded into reused buffers, so a yielded array is overwritten on the
+        next iteration; pass copy=True (or copy it yourself) to keep frames around.
+        
         Args:
             video_path: Path to the video file
             interval_sec: Time interval between frames in seconds
+            max_side: Longest side of the yielded frames in pixels (0 keeps full resolution)
+            copy: Yield an independent copy of each frame
             
         Yields:
             Tuple of (frame as numpy array, timestamp in seconds)
@@ -203,29 +341,34 @@ class VideoProcessor:
             raise FileNotFoundError(f"Video file not found: {video_path}")
             
         # Open the video file
-        cap = cv2.VideoCapture(video_path)
+        cap = _open_capture(video_path)
         if not cap.isOpened():
             raise ValueError(f"Failed to open video file: {video_path}")
             
         # Get video properties
         fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_interval = int(fps * interval_sec)
-        frame_count = 0
+        frame_interval = max(1, int(fps * interval_sec))
+        index = 0
+        # Decode and resize targets, allocated on the first frame and reused afterwards
+        decoded, resized = None, None
         
         try:
-            while True:
-                # Set position to next frame
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_count * frame_interval)
-                ret, frame = cap.read()
-                
-                if not ret:
-                    break
+            # Sequential grab/retrieve: skipped frames are never converted to BGR
+            while cap.grab():
+                if index % frame_interval == 0:
+                    ret, decoded = cap.retrieve(decoded)
+                    if not ret:
+                        break
+                        
+                    # Calculate timestamp in seconds
+                    timestamp = index / fps
                     
-                # Calculate timestamp in seconds
-                timestamp = (frame_count * frame_interval) / fps
-                
-                yield (frame, timestamp)
-                frame_count += 1
+                    frame = _downscale(decoded, max_side, resized)
+                    if frame is not decoded:
+                        resized = frame
+                    
+                    yield (frame.copy() if copy else frame, timestamp)
+                index += 1
                 
         finally:
             cap.release() 
\ No newline at end of file